@@ -0,0 +1,324 @@
+"""终端链路基准测试
+
+在子进程中启动基于 paramiko 的本地 SSH 服务端替身，通过 Socket.IO 测试客户端驱动
+open_ssh / ssh_input 事件，测量：
+
+- 建立连接耗时（open_ssh -> ssh_connected）
+- 按键回显延迟分位数（ssh_input -> 包含该字符的 ssh_output）
+- 批量输出吞吐（MB/s）和每 MB 的 ssh_output 帧数
+- 批量输出期间后端进程每 MB 消耗的 CPU 时间
+
+结果写入 JSON，便于在发布前对比热路径的性能回退；默认写到系统临时目录，
+不在工作树中留下文件。
+
+用法：
+    python benchmark.py [--bulk-mb 20] [--echo-count 200] [--output benchmark_results.json]
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# 服务端替身在子进程中运行，不受 service 的 gevent monkey patch 影响
+BULK_BLOCK = (b'x' * 79 + b'\n') * 800
+
+
+class StandInServer:
+    """接受任意凭据的最小 SSH 服务端，只实现交互式 shell"""
+
+    def __init__(self):
+        import paramiko
+        self.paramiko = paramiko
+        self.host_key = paramiko.RSAKey.generate(2048)
+
+    def make_interface(self):
+        paramiko = self.paramiko
+
+        class Interface(paramiko.ServerInterface):
+            def __init__(self):
+                self.shell_ready = threading.Event()
+
+            def check_channel_request(self, kind, chanid):
+                return paramiko.OPEN_SUCCEEDED
+
+            def check_auth_password(self, username, password):
+                return paramiko.AUTH_SUCCESSFUL
+
+            def get_allowed_auths(self, username):
+                return 'password'
+
+            def check_channel_pty_request(self, *args):
+                return True
+
+            def check_channel_window_change_request(self, *args):
+                return True
+
+            def check_channel_env_request(self, *args):
+                return True
+
+            def check_channel_shell_request(self, channel):
+                self.shell_ready.set()
+                return True
+
+        return Interface()
+
+    def run_shell(self, channel):
+        """回显输入；`bulk N` 输出 N 字节，`exit` 关闭通道"""
+        channel.sendall(b'$ ')
+        line = b''
+        while True:
+            data = channel.recv(65536)
+            if not data:
+                break
+            channel.sendall(data)
+            line += data
+            while b'\r' in line:
+                command, _, line = line.partition(b'\r')
+                command = command.strip()
+                if command.startswith(b'bulk '):
+                    remaining = int(command.split()[1])
+                    while remaining > 0:
+                        chunk = BULK_BLOCK[:remaining]
+                        channel.sendall(chunk)
+                        remaining -= len(chunk)
+                elif command == b'exit':
+                    channel.close()
+                    return
+                channel.sendall(b'\r\n$ ')
+        channel.close()
+
+    def handle(self, sock):
+        # 与 sshd 交互会话一致，关闭 Nagle，避免回显和提示符被合并延迟
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        transport = self.paramiko.Transport(sock)
+        transport.add_server_key(self.host_key)
+        interface = self.make_interface()
+        transport.start_server(server=interface)
+        while transport.is_active():
+            channel = transport.accept(1)
+            if channel is None:
+                continue
+            if interface.shell_ready.wait(5):
+                interface.shell_ready.clear()
+                threading.Thread(target=self.run_shell, args=(channel,), daemon=True).start()
+
+    def serve(self, port=0):
+        listener = socket.socket()
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(('127.0.0.1', port))
+        listener.listen(16)
+        print(listener.getsockname()[1], flush=True)
+        while True:
+            sock, _ = listener.accept()
+            threading.Thread(target=self.handle, args=(sock,), daemon=True).start()
+
+
+def start_stand_in():
+    """启动服务端替身子进程，返回 (进程, 端口)"""
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve'],
+        stdout=subprocess.PIPE
+    )
+    port = int(process.stdout.readline())
+    return process, port
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def cpu_time():
+    times = os.times()
+    return times.user + times.system
+
+
+class TerminalBench:
+    def __init__(self, service, port, output_mode):
+        self.service = service
+        self.gevent = sys.modules['gevent']
+        self.connection = {
+            'host': '127.0.0.1',
+            'port': port,
+            'username': 'bench',
+            'authType': 'password',
+            'password': 'bench',
+            'output_mode': output_mode
+        }
+        self.client = service.socketio.test_client(service.app)
+        self.received = []
+
+    def drain(self):
+        self.received.extend(self.client.get_received())
+
+    def wait_for(self, predicate, timeout=30):
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            self.drain()
+            result = predicate()
+            if result:
+                return result
+            # sleep(0) 忙等会让事件循环迟迟不轮询 IO，测得的延迟偏高
+            self.gevent.sleep(0.0002)
+        raise TimeoutError('benchmark step timed out')
+
+    def take(self, name, session_id):
+        """取出并移除指定事件"""
+        matched = [m for m in self.received if m['name'] == name and m['args'][0].get('session_id') == session_id]
+        self.received = [m for m in self.received if m not in matched]
+        return matched
+
+    def output_bytes(self, messages):
+        total = 0
+        for message in messages:
+            output = message['args'][0]['output']
+            total += len(output if isinstance(output, bytes) else output.encode('utf-8'))
+        return total
+
+    def open(self, session_id):
+        started = time.perf_counter()
+        self.client.emit('open_ssh', dict(self.connection, session_id=session_id))
+        self.wait_for(lambda: self.take('ssh_connected', session_id) or self.take('ssh_error', session_id))
+        elapsed = time.perf_counter() - started
+        # 等待提示符，避免影响后续测量
+        self.wait_for(lambda: any(m['name'] == 'ssh_output' for m in self.received))
+        self.take('ssh_output', session_id)
+        return elapsed
+
+    def close(self, session_id):
+        self.client.emit('close_ssh', {'session_id': session_id})
+        self.gevent.sleep(0.05)
+        self.drain()
+        self.received.clear()
+
+    def measure_connect(self, count):
+        times = []
+        for index in range(count):
+            session_id = f'bench-connect-{index}'
+            times.append(self.open(session_id))
+            self.close(session_id)
+        return times
+
+    def measure_echo(self, session_id, count):
+        latencies = []
+        for index in range(count):
+            char = chr(ord('a') + index % 26)
+            started = time.perf_counter()
+            self.client.emit('ssh_input', {'session_id': session_id, 'input': char})
+
+            def echoed():
+                for message in self.take('ssh_output', session_id):
+                    output = message['args'][0]['output']
+                    if isinstance(output, bytes):
+                        output = output.decode('utf-8', 'replace')
+                    if char in output:
+                        return True
+                return False
+            self.wait_for(echoed)
+            latencies.append(time.perf_counter() - started)
+        # 清掉残留的回显
+        self.client.emit('ssh_input', {'session_id': session_id, 'input': '\r'})
+        self.gevent.sleep(0.05)
+        self.drain()
+        self.take('ssh_output', session_id)
+        return latencies
+
+    def measure_bulk(self, session_id, size):
+        frames = []
+
+        def done():
+            frames.extend(self.take('ssh_output', session_id))
+            return self.output_bytes(frames) >= size
+
+        cpu_started = cpu_time()
+        started = time.perf_counter()
+        self.client.emit('ssh_input', {'session_id': session_id, 'input': f'bulk {size}\r'})
+        self.wait_for(done, timeout=max(30, size / (1024 * 1024)))
+        elapsed = time.perf_counter() - started
+        cpu = cpu_time() - cpu_started
+        return elapsed, cpu, len(frames), self.output_bytes(frames)
+
+
+def run(args):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import service
+
+    # 基准只关心热路径，关闭会话相关的信息日志
+    service.configure_logging({'logLevels': {'root': 'WARNING'}})
+    # 不把基准会话计入真实的连接使用频率
+    service.connection_usage = service.ConnectionUsage(
+        os.path.join(tempfile.mkdtemp(prefix='simpleshell-bench-'), 'connection_usage.json')
+    )
+    server, port = start_stand_in()
+    try:
+        bench = TerminalBench(service, port, args.output_mode)
+        connect_times = bench.measure_connect(args.connect_count)
+
+        session_id = 'bench-session'
+        bench.open(session_id)
+        latencies = bench.measure_echo(session_id, args.echo_count)
+        bulk_size = int(args.bulk_mb * 1024 * 1024)
+        elapsed, cpu, frames, received = bench.measure_bulk(session_id, bulk_size)
+        bench.close(session_id)
+    finally:
+        server.kill()
+
+    megabytes = received / (1024 * 1024)
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'output_mode': args.output_mode,
+        'connect_seconds': {
+            'count': len(connect_times),
+            'p50': percentile(connect_times, 0.5),
+            'max': max(connect_times) if connect_times else None
+        },
+        'echo_latency_ms': {
+            'count': len(latencies),
+            'p50': percentile(latencies, 0.5) * 1000,
+            'p90': percentile(latencies, 0.9) * 1000,
+            'p99': percentile(latencies, 0.99) * 1000,
+            'max': max(latencies) * 1000
+        },
+        'bulk_output': {
+            'bytes': received,
+            'seconds': elapsed,
+            'mb_per_second': megabytes / elapsed if elapsed else None,
+            'emits_per_mb': frames / megabytes if megabytes else None,
+            'cpu_seconds_per_mb': cpu / megabytes if megabytes else None
+        }
+    }
+    output = args.output or os.path.join(tempfile.gettempdir(), 'simpleshell-benchmark.json')
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SimpleShell terminal path benchmark')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--connect-count', type=int, default=5)
+    parser.add_argument('--echo-count', type=int, default=200)
+    parser.add_argument('--bulk-mb', type=float, default=20)
+    parser.add_argument('--output-mode', choices=('text', 'binary'), default='binary')
+    parser.add_argument('--output', help='结果 JSON 路径，默认写到系统临时目录')
+    args = parser.parse_args()
+
+    if args.serve:
+        StandInServer().serve()
+    else:
+        run(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,45 +2,207 @@ from gevent import monkey
 monkey.patch_all()
 
 from flask import Flask, request, jsonify, send_file, Response
-from flask_socketio import SocketIO
+from flask_socketio import SocketIO, join_room, leave_room
 from flask_cors import CORS
+from werkzeug.http import http_date
 import paramiko
 import json
 import os
 import stat
 import logging
+import logging.handlers
 import threading
+import queue
 import time
 import tempfile
 import io
-from datetime import datetime
+import codecs
+from datetime import datetime, timezone
 import socket
+import select
+import struct
+import subprocess
 import sys
 import requests
 import atexit
 import re
+import shlex
+import posixpath
+import tarfile
+import zipfile
 import httpx
 from typing import Dict, Tuple, Optional
+from collections import deque
 from functools import lru_cache
+from contextlib import contextmanager
 import uuid
+import hashlib
 import base64
 
+# 配置更轻量的日志
+# 日志记录先进入无界队列，由原生线程写出，stdout 阻塞时不会卡住 gevent 事件循环
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s: %(message)s'
+DEFAULT_LOG_LEVELS = {
+    'root': 'WARNING',  # 只记录警告和错误
+    'socketio': 'WARNING',
+    'engineio': 'WARNING',
+}
+DEFAULT_FRAME_LOG_SAMPLE_RATE = 1000  # 逐帧日志每 N 条记录一条
+
+class SamplingFilter(logging.Filter):
+    """每 rate 条记录只放行一条，用于逐帧、逐按键等高频日志"""
+    def __init__(self, rate: int = 1):
+        super().__init__()
+        self.rate = max(1, int(rate))
+        self._count = 0
+
+    def filter(self, record):
+        passed = self._count % self.rate == 0
+        self._count += 1
+        return passed
+
+class NativeQueueListener(logging.handlers.QueueListener):
+    """在原生线程中消费日志队列（threading 已被 gevent 替换，需使用原始 _thread）"""
+    def start(self):
+        self._stopped = monkey.get_original('_thread', 'allocate_lock')()
+        self._stopped.acquire()
+        monkey.get_original('_thread', 'start_new_thread')(self._run, ())
+
+    def _run(self):
+        try:
+            self._monitor()
+        finally:
+            self._stopped.release()
+
+    def stop(self):
+        self.enqueue_sentinel()
+        self._stopped.acquire(timeout=1)
+
+_log_listener = None
+
+def configure_logging(settings=None):
+    """按 settings 中的 logLevels 设置各模块日志级别，可重复调用"""
+    global _log_listener
+    settings = settings or {}
+
+    if _log_listener is None:
+        log_queue = monkey.get_original('queue', 'SimpleQueue')()
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        # 处理器只在原生线程中使用，换成原生锁
+        stream_handler.lock = monkey.get_original('threading', 'RLock')()
+        _log_listener = NativeQueueListener(log_queue, stream_handler)
+        _log_listener.start()
+        atexit.register(_log_listener.stop)
+
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    levels = dict(DEFAULT_LOG_LEVELS)
+    levels.update(settings.get('logLevels') or {})
+    for name, level in levels.items():
+        try:
+            logging.getLogger(None if name == 'root' else name).setLevel(str(level).upper())
+        except (TypeError, ValueError):
+            logging.getLogger(__name__).warning(f"Invalid log level for {name}: {level}")
+
+    try:
+        frame_sampler.rate = max(1, int(settings.get('frameLogSampleRate', DEFAULT_FRAME_LOG_SAMPLE_RATE)))
+    except (TypeError, ValueError):
+        frame_sampler.rate = DEFAULT_FRAME_LOG_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+terminal_logger = logging.getLogger('simpleshell.terminal')
+# 逐帧输出日志默认关闭，开启后按采样率记录
+frame_logger = logging.getLogger('simpleshell.terminal.frames')
+frame_sampler = SamplingFilter(DEFAULT_FRAME_LOG_SAMPLE_RATE)
+frame_logger.addFilter(frame_sampler)
+configure_logging()
+
 app = Flask(__name__)
-CORS(app)
+# 断点续传需要前端读取这些响应头
+CORS(app, expose_headers=['Accept-Ranges', 'Content-Range', 'Last-Modified'])
 socketio = SocketIO(app, 
                    cors_allowed_origins="*",
                    async_mode='gevent',
-                   logger=True,
-                   engineio_logger=True,
+                   logger=logging.getLogger('socketio'),
+                   engineio_logger=logging.getLogger('engineio'),
                    ping_timeout=300,
                    ping_interval=60)
 
-# 配置更轻量的日志
-logging.basicConfig(
-    level=logging.WARNING,  # 只记录警告和错误
-    format='%(asctime)s - %(levelname)s: %(message)s'
-)
-logger = logging.getLogger(__name__)
+# 原生线程池大小，用于不涉及网络的 CPU 密集或阻塞磁盘操作
+BLOCKING_EXECUTOR_SIZE = 4
+
+class BlockingExecutor:
+    """在原生线程池中执行阻塞操作，调用的协程只等待结果，不占用 gevent 事件循环
+
+    paramiko 的传输建立在 gevent socket 上，不能跨原生线程使用；
+    这里只提交私钥解析、编解码、压缩、摘要和本地文件读写等不触及 socket 的工作。
+    """
+    def __init__(self, size: int = BLOCKING_EXECUTOR_SIZE):
+        self.size = size
+        self._pool = None
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def _get_pool(self):
+        if self._pool is None:
+            from gevent.threadpool import ThreadPool
+            self._pool = ThreadPool(self.size)
+        return self._pool
+
+    def run(self, fn, *args, **kwargs):
+        """在线程池中执行 fn 并返回结果，异常原样抛出"""
+        submitted_at = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            try:
+                return started, True, fn(*args, **kwargs)
+            except BaseException as e:
+                return started, False, e
+
+        self.submitted += 1
+        self.in_flight += 1
+        try:
+            started, ok, result = self._get_pool().apply(task)
+        finally:
+            self.in_flight -= 1
+        # 计数只在协程中更新，原生线程不修改共享状态
+        wait = started - submitted_at
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.total_run += time.perf_counter() - started
+        if not ok:
+            self.failed += 1
+            raise result
+        self.completed += 1
+        return result
+
+    def stats(self) -> Dict:
+        pool = self._pool
+        finished = self.completed + self.failed
+        return {
+            'size': self.size,
+            'queue_depth': pool.task_queue.qsize() if pool else 0,
+            'in_flight': self.in_flight,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'avg_wait_ms': round(self.total_wait / finished * 1000, 3) if finished else 0,
+            'max_wait_ms': round(self.max_wait * 1000, 3),
+            'avg_run_ms': round(self.total_run / finished * 1000, 3) if finished else 0
+        }
+
+# 全局阻塞操作线程池
+blocking_executor = BlockingExecutor()
 
 @lru_cache(maxsize=32)
 def get_executable_dir():
@@ -56,6 +218,61 @@ def get_executable_dir():
 CONFIG_PATH = os.path.join(get_executable_dir(), 'config.json')
 # 日志文件路径
 LOG_PATH = os.path.join(get_executable_dir(), 'sftp_log.log')
+# 连接使用频率记录路径
+USAGE_PATH = os.path.join(get_executable_dir(), 'connection_usage.json')
+
+# 每个会话保留的回滚输出上限（字节）
+SCROLLBACK_MAX_BYTES = 2 * 1024 * 1024
+
+class ScrollbackBuffer:
+    """按字节预算裁剪的终端输出环形缓冲
+
+    序号为会话累计输出的字节偏移，客户端据此请求断线期间错过的输出。
+    """
+    def __init__(self, max_bytes: int = SCROLLBACK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.seq = 0  # 已写入的总字节数
+        self._chunks = deque()  # (起始序号, 数据)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        """当前缓冲的字节数"""
+        return self._size
+
+    def append(self, data: bytes) -> int:
+        """追加一帧输出，返回追加后的序号"""
+        with self._lock:
+            self._chunks.append((self.seq, data))
+            self.seq += len(data)
+            self._size += len(data)
+
+            # 超出预算时丢弃最旧的数据，单帧过大时只保留尾部
+            while self._size > self.max_bytes:
+                start, chunk = self._chunks[0]
+                overflow = self._size - self.max_bytes
+                if len(chunk) <= overflow:
+                    self._chunks.popleft()
+                    self._size -= len(chunk)
+                else:
+                    self._chunks[0] = (start + overflow, chunk[overflow:])
+                    self._size -= overflow
+            return self.seq
+
+    def read_since(self, seq: int) -> Tuple[int, bytes]:
+        """返回 (实际起始序号, 数据)，起始序号大于 seq 说明中间部分已被丢弃"""
+        with self._lock:
+            seq = max(0, min(seq, self.seq))
+            first = self._chunks[0][0] if self._chunks else self.seq
+            start = max(seq, first)
+            parts = []
+            for chunk_start, chunk in self._chunks:
+                chunk_end = chunk_start + len(chunk)
+                if chunk_end <= start:
+                    continue
+                parts.append(chunk[max(0, start - chunk_start):])
+            return start, b''.join(parts)
 
 # 修改会话管理相关代码
 class SSHSession:
@@ -67,28 +284,204 @@ class SSHSession:
         self.lock = threading.Lock()
         self.client_id = None  # 添加客户端ID
         self.realtime_thread = None  # 添加实时线程属性
+        self.output_mode = 'text'  # 输出模式：text 或 binary
+        # 文本模式下的增量解码器，保留跨帧被截断的多字节字符
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.scrollback = ScrollbackBuffer()  # 断线重连时用于回放的输出缓冲
+        self.input_queue = queue.Queue()  # 待写入通道的输入，由写线程批量发送
+        self.write_thread = None
+        self.connection_key = None  # 与连接池相同的连接标识，用于复用终端传输
+        self.sftp_channels = 0  # 在终端传输上打开的 SFTP 通道数
+        self.idle_sftp = []  # 归还后保留的 SFTP 客户端
+        self.bytes_in = 0  # 写入通道的输入字节数
+        self.bytes_out = 0  # 从通道读取的输出字节数
+        self.created_at = time.time()
+        self.last_activity = time.time()  # 最近一次输入或输出的时间
+        self.orphaned_at = None  # 属主客户端断开的时间，重新接管后清空
+        # 流控：客户端确认已渲染的输出序号，未确认量过高时暂停读取通道
+        self.flow_control = False
+        self.acked_seq = 0
+        self.flow_resume = threading.Event()
+        self.flow_resume.set()
+
+    def start(self):
+        """启动读写线程"""
+        if self.read_thread:
+            self.read_thread.start()
+        if self.write_thread:
+            self.write_thread.start()
+
+    def stop_input(self):
+        """唤醒并结束写线程"""
+        self.input_queue.put(None)
+
+    def unacked_bytes(self) -> int:
+        return self.scrollback.seq - self.acked_seq
+
+    def ack_output(self, seq: int):
+        """客户端确认已处理到 seq，未确认量回落到低水位以下时恢复读取"""
+        self.acked_seq = max(self.acked_seq, min(seq, self.scrollback.seq))
+        if self.unacked_bytes() <= FLOW_LOW_WATERMARK:
+            self.flow_resume.set()
+
+    def release_flow(self):
+        """放弃未确认的输出并恢复读取，用于客户端断开或会话关闭"""
+        self.acked_seq = self.scrollback.seq
+        self.flow_resume.set()
+
+    def encode_output(self, data: bytes):
+        """按输出模式转换一帧终端输出，文本模式下可能返回空字符串"""
+        if self.output_mode == 'binary':
+            return data
+        return self.decoder.decode(data)
+
+OUTPUT_MODES = ('text', 'binary')
+
+# 终端输出泵参数
+OUTPUT_READ_SIZE = 64 * 1024         # 单帧最大字节数，达到即发送
+OUTPUT_BURST_THRESHOLD = 4096        # 首次读取超过该大小视为突发输出，启用合并
+OUTPUT_FLUSH_INTERVAL = 0.005        # 突发输出的最大合并延迟（秒）
+CHANNEL_KEEPALIVE_INTERVAL = 60      # 通道空闲保活间隔（秒）
+INPUT_BATCH_BYTES = 64 * 1024        # 写线程单次合并发送的最大输入字节数
+
+# 终端流控参数：未确认输出超过高水位时停止读取通道，SSH 窗口随之向远端施加反压
+FLOW_HIGH_WATERMARK = 1024 * 1024
+FLOW_LOW_WATERMARK = 256 * 1024
+TERMINAL_WINDOW_SIZE = 2 * 1024 * 1024   # 终端通道的 SSH 接收窗口
+TERMINAL_MAX_PACKET_SIZE = 32768
+
+def session_room(session_id):
+    """会话输出所在的 Socket.IO 房间，只有属主和主动附加的查看者在其中"""
+    return f"ssh:{session_id}"
+
+SESSION_REGISTRY_SHARDS = 16
 
-# 修改会话存储结构
-ssh_sessions = {}
-client_sessions = {}  # 添加客户端会话映射
-sessions_lock = threading.Lock()
+class SessionRegistry:
+    """分片加锁的 SSH 会话注册表
+
+    会话按 session_id 散列到各分片，写操作只锁所在分片，读操作不加锁；
+    客户端到会话的索引单独加锁，按客户端查询为 O(1)。
+    """
+    def __init__(self, shard_count: int = SESSION_REGISTRY_SHARDS):
+        self._shards = [({}, threading.Lock()) for _ in range(shard_count)]
+        self._clients = {}  # client_id -> set(session_id)
+        self._clients_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        # 已移除会话的累计流量，与活动会话合计得到总量
+        self._closed_bytes_in = 0
+        self._closed_bytes_out = 0
+
+    def _shard(self, session_id):
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    def get(self, session_id) -> Optional[SSHSession]:
+        sessions, _ = self._shard(session_id)
+        return sessions.get(session_id)
+
+    def add(self, session_id, session: SSHSession):
+        sessions, lock = self._shard(session_id)
+        with lock:
+            sessions[session_id] = session
+        if session.client_id:
+            with self._clients_lock:
+                self._clients.setdefault(session.client_id, set()).add(session_id)
+
+    def remove(self, session_id) -> Optional[SSHSession]:
+        sessions, lock = self._shard(session_id)
+        with lock:
+            session = sessions.pop(session_id, None)
+        if session:
+            with self._clients_lock:
+                owned = self._clients.get(session.client_id)
+                if owned:
+                    owned.discard(session_id)
+            with self._stats_lock:
+                self._closed_bytes_in += session.bytes_in
+                self._closed_bytes_out += session.bytes_out
+        return session
+
+    def bind_client(self, session_id, client_id):
+        """将会话的所有权转移给另一个客户端"""
+        session = self.get(session_id)
+        if not session:
+            return None
+        with self._clients_lock:
+            owned = self._clients.get(session.client_id)
+            if owned:
+                owned.discard(session_id)
+            self._clients.setdefault(client_id, set()).add(session_id)
+            session.client_id = client_id
+            session.orphaned_at = None
+        return session
+
+    def unregister_client(self, client_id) -> set:
+        """移除断开的客户端，其拥有的会话标记为孤儿，等待重新接管或回收"""
+        with self._clients_lock:
+            owned = self._clients.pop(client_id, set())
+        now = time.time()
+        for session_id in owned:
+            session = self.get(session_id)
+            if session and session.client_id == client_id:
+                session.orphaned_at = now
+        return owned
+
+    def __len__(self):
+        return sum(len(sessions) for sessions, _ in self._shards)
+
+    def register_client(self, client_id):
+        with self._clients_lock:
+            self._clients.setdefault(client_id, set())
+
+    def sessions_for_client(self, client_id) -> set:
+        with self._clients_lock:
+            return set(self._clients.get(client_id, ()))
+
+    def snapshot(self) -> Dict[str, SSHSession]:
+        """返回所有会话的浅拷贝，遍历期间不持有任何锁"""
+        result = {}
+        for sessions, lock in self._shards:
+            with lock:
+                result.update(sessions)
+        return result
+
+    def stats(self) -> Dict:
+        sessions = self.snapshot().values()
+        with self._stats_lock:
+            bytes_in = self._closed_bytes_in
+            bytes_out = self._closed_bytes_out
+        with self._clients_lock:
+            clients = len(self._clients)
+        return {
+            'sessions': len(sessions),
+            'active_sessions': sum(1 for session in sessions if session.active),
+            'orphaned_sessions': sum(1 for session in sessions if session.orphaned_at),
+            'clients': clients,
+            'bytes_in': bytes_in + sum(session.bytes_in for session in sessions),
+            'bytes_out': bytes_out + sum(session.bytes_out for session in sessions)
+        }
+
+# 全局会话注册表
+session_registry = SessionRegistry()
 
 @socketio.on('connect')
 def handle_connect():
     client_id = request.sid
-    print(f"Client connected: {client_id}")
-    with sessions_lock:
-        client_sessions[client_id] = set()
+    terminal_logger.info(f"Client connected: {client_id}")
+    session_registry.register_client(client_id)
 
 @socketio.on('disconnect')
 def handle_disconnect():
     client_id = request.sid
-    print(f"Client disconnected: {client_id}")
-    with sessions_lock:
-        if client_id in client_sessions:
-            # 不要立即清理会话，只记录客户端断
-            print(f"Client {client_id} disconnected but keeping sessions")
-            return
+    terminal_logger.info(f"Client disconnected: {client_id}")
+    owned = session_registry.unregister_client(client_id)
+    if owned:
+        # 不要立即清理会话，只记录客户端断开
+        terminal_logger.info(f"Client {client_id} disconnected but keeping sessions for reattach")
+        # 断开期间不会再有确认，解除流控让输出继续进入回滚缓冲
+        for session_id in owned:
+            session = session_registry.get(session_id)
+            if session:
+                session.release_flow()
 
 def load_config():
     try:
@@ -125,6 +518,10 @@ def load_config():
             'historyPageSize': 10
         }]
 
+def load_settings():
+    """返回配置中的 settings 对象"""
+    return next((item for item in load_config() if item.get('type') == 'settings'), {})
+
 def save_config(config):
     try:
         with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
@@ -171,15 +568,163 @@ def add_folder():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/prewarm_connection', methods=['POST'])
+def prewarm_connection_route():
+    """前端悬停连接时调用，在后台提前建立并认证连接"""
+    try:
+        connection = request.json.get('connection')
+        if not connection or not connection.get('host'):
+            return jsonify({"error": "Missing connection"}), 400
+        socketio.start_background_task(prewarm_connection, connection)
+        return jsonify({"status": "success"})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/update_config', methods=['POST'])
 def update_config():
     try:
         new_config = request.json
         save_config(new_config)
+        settings = next((item for item in new_config if item.get('type') == 'settings'), None)
+        if settings:
+            configure_logging(settings)
+            session_lifecycle.configure(settings)
+            connection_pool.configure(settings)
         return jsonify({"status": "success"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# 口令解锁的私钥在内存中保留的时间（秒）
+PRIVATE_KEY_PASSPHRASE_TTL = 1800
+
+class PrivateKeyCache:
+    """按路径和修改时间缓存已解析的私钥
+
+    自动识别 Ed25519、ECDSA 和 RSA 私钥；文件变化后重新解析，
+    用口令解锁的私钥只保留 PRIVATE_KEY_PASSPHRASE_TTL 秒。
+    """
+    KEY_CLASSES = (paramiko.Ed25519Key, paramiko.ECDSAKey, paramiko.RSAKey)
+
+    def __init__(self, passphrase_ttl: float = PRIVATE_KEY_PASSPHRASE_TTL):
+        self.passphrase_ttl = passphrase_ttl
+        self._keys = {}  # (路径, mtime, 大小, 口令摘要) -> (私钥, 过期时间)
+        self._lock = threading.Lock()
+
+    def load(self, path: str, passphrase: Optional[str] = None) -> paramiko.PKey:
+        path = os.path.abspath(os.path.expanduser(path))
+        file_stat = os.stat(path)
+        digest = hashlib.sha256(passphrase.encode('utf-8')).hexdigest() if passphrase else None
+        cache_key = (path, file_stat.st_mtime_ns, file_stat.st_size, digest)
+        now = time.time()
+
+        with self._lock:
+            cached = self._keys.get(cache_key)
+        if cached and (cached[1] is None or cached[1] > now):
+            return cached[0]
+
+        # 加密私钥的 KDF 可能耗时数百毫秒，放到线程池中解析
+        pkey = blocking_executor.run(self._parse, path, passphrase)
+        expires_at = now + self.passphrase_ttl if passphrase else None
+        with self._lock:
+            # 丢弃同一文件的旧条目（文件已修改或已过期）
+            for stale in [key for key in self._keys if key[0] == path]:
+                del self._keys[stale]
+            self._keys[cache_key] = (pkey, expires_at)
+        return pkey
+
+    def _parse(self, path: str, passphrase: Optional[str]) -> paramiko.PKey:
+        last_error = None
+        for key_class in self.KEY_CLASSES:
+            try:
+                return key_class.from_private_key_file(path, password=passphrase)
+            except paramiko.PasswordRequiredException:
+                raise
+            except paramiko.SSHException as e:
+                last_error = e
+        raise last_error or paramiko.SSHException('Unsupported private key type')
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+
+# 全局私钥缓存
+private_key_cache = PrivateKeyCache()
+
+# 连接性能配置：算法按顺序优先协商（对端不支持时回退到 paramiko 默认列表），
+# window_size / max_packet_size 作用于该连接上打开的 SFTP 等通道
+CONNECTION_PROFILES = {
+    # 保持原有行为：默认算法，不压缩（原来连接后调用的 use_compression 并不生效）
+    'default': {
+        'ciphers': [],
+        'macs': [],
+        'kex': [],
+        'compression': False,
+        'window_size': 2 * 1024 * 1024,
+        'max_packet_size': 32768
+    },
+    # 局域网高吞吐：关闭压缩，优先 AEAD / CTR 加密与 ETM 消息认证，大窗口
+    'lan': {
+        'ciphers': ['aes128-gcm@openssh.com', 'chacha20-poly1305@openssh.com', 'aes128-ctr', 'aes256-ctr'],
+        'macs': ['hmac-sha2-256-etm@openssh.com', 'hmac-sha2-256'],
+        'kex': ['curve25519-sha256@libssh.org', 'ecdh-sha2-nistp256'],
+        'compression': False,
+        'window_size': 16 * 1024 * 1024,
+        'max_packet_size': 32768
+    },
+    # 广域网低带宽：启用压缩，适中窗口
+    'wan': {
+        'ciphers': ['chacha20-poly1305@openssh.com', 'aes128-gcm@openssh.com', 'aes128-ctr'],
+        'macs': ['hmac-sha2-256-etm@openssh.com', 'hmac-sha2-256'],
+        'kex': ['curve25519-sha256@libssh.org', 'ecdh-sha2-nistp256'],
+        'compression': True,
+        'window_size': 4 * 1024 * 1024,
+        'max_packet_size': 32768
+    }
+}
+
+def get_connection_profile(connection) -> Dict:
+    """返回连接的性能配置，custom 以 default 为基础叠加 customProfile 中的字段"""
+    name = connection.get('performanceProfile') or 'default'
+    if name == 'custom':
+        profile = dict(CONNECTION_PROFILES['default'])
+        custom = connection.get('customProfile') or {}
+        for field, key in (('ciphers', 'ciphers'), ('macs', 'macs'), ('kex', 'kex'),
+                           ('compression', 'compression'), ('window_size', 'windowSize'),
+                           ('max_packet_size', 'maxPacketSize')):
+            if key in custom:
+                profile[field] = custom[key]
+        return profile
+    return CONNECTION_PROFILES.get(name, CONNECTION_PROFILES['default'])
+
+def prefer_algorithms(available, preferred):
+    """将 preferred 中本地支持的算法排到前面，其余保持原顺序"""
+    if not preferred:
+        return tuple(available)
+    first = [name for name in preferred if name in available]
+    return tuple(first + [name for name in available if name not in first])
+
+def profile_transport_factory(profile):
+    """生成 SSHClient.connect 使用的 Transport 工厂，在协商前应用性能配置"""
+    def factory(sock, **kwargs):
+        transport = paramiko.Transport(sock, **kwargs)
+        options = transport.get_security_options()
+        options.ciphers = prefer_algorithms(options.ciphers, profile.get('ciphers'))
+        options.digests = prefer_algorithms(options.digests, profile.get('macs'))
+        options.kex = prefer_algorithms(options.kex, profile.get('kex'))
+        transport.default_window_size = int(profile.get('window_size') or 2 * 1024 * 1024)
+        transport.default_max_packet_size = int(profile.get('max_packet_size') or 32768)
+        return transport
+    return factory
+
+def decode_secret(value: str) -> str:
+    """解密前端以 base64 编码保存的密码或口令，失败时按明文处理"""
+    try:
+        padded = value + '=' * ((4 - len(value) % 4) % 4)
+        return base64.b64decode(padded).decode('utf-8')
+    except Exception as e:
+        logger.debug(f"Base64 decryption failed: {e}")
+        return value
+
 # 分离 SSH SFTP 的连接创建函数
 def create_base_client(connection):
     """创建基础 SSH 客户端"""
@@ -188,31 +733,28 @@ def create_base_client(connection):
         ssh = paramiko.SSHClient()
         ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         
+        profile = get_connection_profile(connection)
         connect_kwargs = {
             'hostname': connection['host'],
             'port': int(connection['port']),
             'username': connection['username'],
-            'timeout': 30
+            'timeout': 30,
+            'compress': bool(profile.get('compression')),
+            'transport_factory': profile_transport_factory(profile)
         }
         
         # 身份验证配置
         if connection.get('authType') == 'password':
             # 解密 base64 编码
-            import base64
-            try:
-                password = connection['password']
-                password += '=' * ((4 - len(password) % 4) % 4)
-                decoded_password = base64.b64decode(password).decode('utf-8')
-                connect_kwargs['password'] = decoded_password
-            except Exception as e:
-                print(f"Base64 decryption failed: {e}")
-                connect_kwargs['password'] = connection['password']
+            connect_kwargs['password'] = decode_secret(connection['password'])
         else:
-            # 使用私钥文件路径
+            # 使用私钥文件路径，解析结果缓存在内存中
             if connection.get('privateKeyPath'):
                 try:
-                    pkey = paramiko.RSAKey.from_private_key_file(
-                        connection['privateKeyPath']
+                    passphrase = connection.get('passphrase')
+                    pkey = private_key_cache.load(
+                        connection['privateKeyPath'],
+                        decode_secret(passphrase) if passphrase else None
                     )
                     connect_kwargs['pkey'] = pkey
                 except paramiko.ssh_exception.SSHException:
@@ -234,24 +776,31 @@ def create_ssh_client(connection):
     """SSH 客户端"""
     ssh = None
     try:
-        ssh = create_base_client(connection)
+        # 优先使用已预热的空闲连接，省去握手和认证
+        ssh = connection_pool.adopt(connection) or create_base_client(connection)
         
         # 创建并配置通道，使用更大的初始终端大小
-        channel = ssh.invoke_shell(
+        # 显式指定有界的接收窗口，流控暂停读取时远端会因窗口耗尽而停止发送
+        channel = ssh.get_transport().open_session(
+            window_size=TERMINAL_WINDOW_SIZE,
+            max_packet_size=TERMINAL_MAX_PACKET_SIZE
+        )
+        channel.update_environment({
+            'TERM': 'xterm-256color',
+            'COLORTERM': 'truecolor',
+            'TERM_PROGRAM': 'xterm',
+            'LANG': 'en_US.UTF-8',
+            'LC_ALL': 'en_US.UTF-8',
+            'FORCE_COLOR': 'true',
+            'COLUMNS': '132',  # 设置环境变量
+            'LINES': '43'
+        })
+        channel.get_pty(
             term='xterm-256color',
             width=132,  # 更大的初始宽度
-            height=43,  # 更大的初始高度
-            environment={
-                'TERM': 'xterm-256color',
-                'COLORTERM': 'truecolor',
-                'TERM_PROGRAM': 'xterm',
-                'LANG': 'en_US.UTF-8',
-                'LC_ALL': 'en_US.UTF-8',
-                'FORCE_COLOR': 'true',
-                'COLUMNS': '132',  # 设置环境变量
-                'LINES': '43'
-            }
+            height=43  # 更大的初始高度
         )
+        channel.invoke_shell()
         
         # 配置通道
         channel.settimeout(0.001)
@@ -261,11 +810,9 @@ def create_ssh_client(connection):
         transport = ssh.get_transport()
         if transport:
             transport.set_keepalive(60)
-            transport.use_compression(True)
-            transport.window_size = 2147483647
             transport.packetizer.REKEY_BYTES = pow(2, 40)
             transport.packetizer.REKEY_PACKETS = pow(2, 40)
-            transport.default_max_packet_size = 32768
+            # 通道窗口和包大小已由连接配置在创建传输时设置，这里不再覆盖
         
         return ssh, channel
         
@@ -277,160 +824,654 @@ def create_ssh_client(connection):
                 pass
         raise
 
-def create_sftp_client(connection):
-    """创建用于文件传输的 SFTP 客户端"""
-    ssh = None  # 初始化 ssh 为 None
-    try:
-        ssh = create_base_client(connection)
-        sftp = ssh.open_sftp()
-        return ssh, sftp
-    except Exception as e:
-        # 如果 SFTP 连接失败，确保关闭连接
-        if ssh:
+# 预热连接在未被使用时的空闲超时（秒）和默认预热的主机数
+PREWARM_IDLE_TTL = 120
+PREWARM_DEFAULT_COUNT = 3
+
+# SFTP 连接池参数
+CONNECTION_POOL_IDLE_TTL = 300          # 空闲传输保留时间（秒）
+CONNECTION_POOL_HEALTH_INTERVAL = 30    # 空闲超过该时间的传输复用前先探活（秒）
+CONNECTION_POOL_MAX_CHANNELS = 8        # 单个传输上同时打开的 SFTP 通道上限（OpenSSH 默认 MaxSessions 为 10）
+CONNECTION_POOL_REAP_INTERVAL = 30      # 空闲回收检查间隔（秒）
+CONNECTION_POOL_IDLE_SFTP = 2           # 每个传输上保留的空闲 SFTP 通道数，复用可省去打开通道的三次往返
+
+class PooledConnection:
+    """连接池中的一个已认证 SSH 连接"""
+    def __init__(self, key, client):
+        self.key = key
+        self.client = client
+        self.leases = 0  # 当前借出的通道数
+        self.created_at = time.time()
+        self.last_used = time.time()
+        self.prewarmed = False  # 预热创建且尚未被使用
+        self.idle_sftp = []  # 归还后保留的 SFTP 客户端
+
+    def is_alive(self) -> bool:
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+class SSHConnectionPool:
+    """按主机、端口、用户和认证身份复用已认证的 SSH 传输
+
+    每次请求只在已有传输上打开新的 SFTP 通道，省去 TCP 连接、密钥交换和认证。
+    """
+    def __init__(self, idle_ttl: float = CONNECTION_POOL_IDLE_TTL,
+                 max_channels: int = CONNECTION_POOL_MAX_CHANNELS):
+        self.idle_ttl = idle_ttl
+        self.max_channels = max_channels
+        self._entries = {}  # key -> [PooledConnection]
+        self._warming = set()  # 正在预热的 key
+        self._lock = threading.Lock()
+        self._reaper = None
+        self.prewarm_ttl = PREWARM_IDLE_TTL
+
+    @staticmethod
+    def connection_key(connection) -> Tuple:
+        auth_type = connection.get('authType') or 'password'
+        if auth_type == 'password':
+            # 只保存密码摘要，区分同一用户的不同凭据
+            # 前端可能传入 base64 或已解码的密码，按实际用于认证的值计算
+            password = decode_secret(str(connection.get('password', '')))
+            identity = hashlib.sha256(password.encode('utf-8')).hexdigest()
+        else:
+            identity = connection.get('privateKeyPath')
+        # 不同性能配置协商出的算法和窗口不同，不能共用传输
+        profile = connection.get('performanceProfile') or 'default'
+        if profile == 'custom':
+            profile = json.dumps(connection.get('customProfile') or {}, sort_keys=True)
+        return (connection['host'], int(connection['port']), connection['username'], auth_type, identity, profile)
+
+    def acquire(self, connection) -> PooledConnection:
+        """借出一个可用连接，没有空闲容量时新建"""
+        key = self.connection_key(connection)
+        while True:
+            entry = None
+            with self._lock:
+                for candidate in self._entries.get(key, []):
+                    if candidate.leases < self.max_channels:
+                        candidate.leases += 1
+                        entry = candidate
+                        break
+            if entry is None:
+                break
+            if self._is_healthy(entry):
+                entry.prewarmed = False
+                return entry
+            self._discard(entry)
+
+        entry = PooledConnection(key, create_base_client(connection))
+        entry.leases = 1
+        with self._lock:
+            self._entries.setdefault(key, []).append(entry)
+        self._ensure_reaper()
+        return entry
+
+    def prewarm(self, connection) -> bool:
+        """后台建立并认证一个空闲连接，已有可用连接或正在预热时直接返回"""
+        key = self.connection_key(connection)
+        with self._lock:
+            if key in self._warming or self._entries.get(key):
+                return False
+            self._warming.add(key)
+        try:
+            entry = PooledConnection(key, create_base_client(connection))
+            entry.prewarmed = True
+            with self._lock:
+                self._entries.setdefault(key, []).append(entry)
+            self._ensure_reaper()
+            return True
+        finally:
+            with self._lock:
+                self._warming.discard(key)
+
+    def adopt(self, connection) -> Optional[paramiko.SSHClient]:
+        """从池中取走一个空闲连接交给终端会话独占，没有时返回 None"""
+        key = self.connection_key(connection)
+        while True:
+            with self._lock:
+                entry = next((e for e in self._entries.get(key, []) if e.leases == 0), None)
+                if entry is None:
+                    return None
+                self._entries[key].remove(entry)
+                if not self._entries[key]:
+                    del self._entries[key]
+            if self._is_healthy(entry):
+                # 空闲的 SFTP 通道只能被连接池复用，交给终端前关闭
+                while entry.idle_sftp:
+                    try:
+                        entry.idle_sftp.pop().close()
+                    except Exception:
+                        pass
+                return entry.client
             try:
-                ssh.close()
-            except:
+                entry.client.close()
+            except Exception:
                 pass
-        raise  # 重新抛出原始异常
+
+    def configure(self, settings):
+        """应用 settings 中的连接池参数"""
+        self.prewarm_ttl = float(settings.get('prewarmIdleTimeout') or PREWARM_IDLE_TTL)
+
+    def release(self, entry: PooledConnection):
+        with self._lock:
+            entry.leases = max(0, entry.leases - 1)
+            entry.last_used = time.time()
+        if not entry.is_alive():
+            self._discard(entry)
+
+    def open_sftp(self, connection, session_id=None):
+        """返回 (连接, SFTP 客户端)，用完后调用 close_sftp 归还
+
+        指定 session_id 且该终端会话使用相同的连接和凭据时，直接在终端的传输上
+        打开 SFTP 通道，不再进行新的握手和认证。
+        """
+        if session_id:
+            session = self._session_for(connection, session_id)
+            if session:
+                try:
+                    sftp = self._take_idle(session) or session.ssh_client.open_sftp()
+                    session.sftp_channels += 1
+                    return session, sftp
+                except Exception as e:
+                    logger.warning(f"Failed to open SFTP on session {session_id}, using pool: {e}")
+
+        entry = self.acquire(connection)
+        try:
+            return entry, self._take_idle(entry) or entry.client.open_sftp()
+        except Exception:
+            self.release(entry)
+            raise
+
+    def close_sftp(self, owner, sftp, reuse=False):
+        """归还 SFTP 客户端，reuse 为 True 且通道正常时保留以供下次使用"""
+        if isinstance(owner, SSHSession):
+            owner.sftp_channels = max(0, owner.sftp_channels - 1)
+            capacity = self.max_channels - 2 - owner.sftp_channels
+        else:
+            capacity = self.max_channels - owner.leases + 1
+        if reuse and not sftp.sock.closed and len(owner.idle_sftp) < min(CONNECTION_POOL_IDLE_SFTP, capacity - 1):
+            owner.idle_sftp.append(sftp)
+        else:
+            try:
+                sftp.close()
+            except Exception:
+                pass
+        if not isinstance(owner, SSHSession):
+            self.release(owner)
+
+    @staticmethod
+    def _take_idle(owner):
+        """取出一个仍然可用的空闲 SFTP 客户端"""
+        while owner.idle_sftp:
+            sftp = owner.idle_sftp.pop()
+            if not sftp.sock.closed:
+                return sftp
+        return None
+
+    @contextmanager
+    def sftp(self, connection, session_id=None):
+        owner, sftp = self.open_sftp(connection, session_id)
+        reuse = False
+        try:
+            yield sftp
+            reuse = True
+        finally:
+            # 出错时通道上可能还有未处理的响应，不再复用
+            self.close_sftp(owner, sftp, reuse)
+
+    @contextmanager
+    def client(self, connection, session_id=None):
+        """借出 SSHClient 用于执行命令，与 open_sftp 一样优先使用终端会话的传输"""
+        session = self._session_for(connection, session_id) if session_id else None
+        if session:
+            session.sftp_channels += 1
+            try:
+                yield session.ssh_client
+            finally:
+                session.sftp_channels = max(0, session.sftp_channels - 1)
+            return
+        entry = self.acquire(connection)
+        try:
+            yield entry.client
+        finally:
+            self.release(entry)
+
+    def _session_for(self, connection, session_id) -> Optional[SSHSession]:
+        """返回可复用的终端会话，连接标识不一致或通道数已满时返回 None"""
+        session = session_registry.get(session_id)
+        if not session or not session.active:
+            return None
+        if session.ssh_client is None or session.connection_key != self.connection_key(connection):
+            return None
+        # 终端本身和资源监控还要占用通道
+        if session.sftp_channels >= self.max_channels - 2:
+            return None
+        transport = session.ssh_client.get_transport()
+        if transport is None or not transport.is_active():
+            return None
+        return session
+
+    def _is_healthy(self, entry: PooledConnection) -> bool:
+        if not entry.is_alive():
+            return False
+        if time.time() - entry.last_used > CONNECTION_POOL_HEALTH_INTERVAL:
+            try:
+                entry.client.get_transport().send_ignore()
+            except Exception:
+                return False
+        return True
+
+    def _discard(self, entry: PooledConnection):
+        with self._lock:
+            entries = self._entries.get(entry.key)
+            if entries and entry in entries:
+                entries.remove(entry)
+                if not entries:
+                    del self._entries[entry.key]
+        try:
+            entry.client.close()
+        except Exception:
+            pass
+
+    def evict_idle(self):
+        """关闭空闲超过 TTL 或已断开的连接，未被使用的预热连接使用更短的 TTL"""
+        now = time.time()
+        with self._lock:
+            expired = [
+                entry
+                for entries in self._entries.values()
+                for entry in entries
+                if entry.leases == 0 and (
+                    now - entry.last_used > (self.prewarm_ttl if entry.prewarmed else self.idle_ttl)
+                    or not entry.is_alive()
+                )
+            ]
+        for entry in expired:
+            self._discard(entry)
+
+    def close_all(self):
+        with self._lock:
+            entries = [entry for entries in self._entries.values() for entry in entries]
+        for entry in entries:
+            self._discard(entry)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = [entry for entries in self._entries.values() for entry in entries]
+        return {
+            'connections': len(entries),
+            'leased_channels': sum(entry.leases for entry in entries),
+            'idle_connections': sum(1 for entry in entries if entry.leases == 0),
+            'prewarmed_connections': sum(1 for entry in entries if entry.prewarmed)
+        }
+
+    def _ensure_reaper(self):
+        if self._reaper is None:
+            self._reaper = socketio.start_background_task(self._reap_loop)
+
+    def _reap_loop(self):
+        while True:
+            socketio.sleep(CONNECTION_POOL_REAP_INTERVAL)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                logger.error(f"Error evicting idle connections: {e}")
+
+# 全局 SFTP 连接池
+connection_pool = SSHConnectionPool()
+
+class ConnectionUsage:
+    """记录每个连接的打开次数和最近使用时间，用于挑选预热的主机"""
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records = None
+
+    @staticmethod
+    def usage_key(connection) -> str:
+        if connection.get('id'):
+            return str(connection['id'])
+        return f"{connection.get('username')}@{connection.get('host')}:{connection.get('port')}"
+
+    def _load(self) -> Dict:
+        if self._records is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._records = json.load(f)
+            except FileNotFoundError:
+                self._records = {}
+            except Exception as e:
+                logger.warning(f"Error loading connection usage: {e}")
+                self._records = {}
+        return self._records
+
+    def record(self, connection):
+        key = self.usage_key(connection)
+        with self._lock:
+            records = self._load()
+            entry = records.setdefault(key, {'count': 0, 'last_used': 0})
+            entry['count'] += 1
+            entry['last_used'] = time.time()
+            try:
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    json.dump(records, f)
+            except Exception as e:
+                logger.warning(f"Error saving connection usage: {e}")
+
+    def top(self, connections, limit: int):
+        """按打开次数和最近使用时间排序返回前 limit 个，从未打开过的连接不参与预热"""
+        with self._lock:
+            records = dict(self._load())
+        used = [(records[self.usage_key(c)], c) for c in connections if self.usage_key(c) in records]
+        used.sort(key=lambda item: (item[0]['count'], item[0]['last_used']), reverse=True)
+        return [c for _, c in used[:limit]]
+
+connection_usage = ConnectionUsage(USAGE_PATH)
+
+def iter_config_connections(config):
+    """遍历配置中的所有连接（包括文件夹内的连接）"""
+    for item in config:
+        if item.get('type') == 'settings':
+            continue
+        if isinstance(item.get('connections'), list):
+            for connection in item['connections']:
+                if connection.get('host'):
+                    yield connection
+        elif item.get('host'):
+            yield item
+
+def prewarm_connection(connection):
+    try:
+        if connection_pool.prewarm(connection):
+            logger.info(f"Prewarmed connection to {connection.get('host')}")
+    except Exception as e:
+        logger.info(f"Prewarm failed for {connection.get('host')}: {e}")
+
+def prewarm_top_connections():
+    """启动后在后台预热最常用的 N 个连接"""
+    config = load_config()
+    settings = next((item for item in config if item.get('type') == 'settings'), {})
+    limit = int(settings.get('prewarmCount', PREWARM_DEFAULT_COUNT))
+    connection_pool.configure(settings)
+    if limit <= 0:
+        return
+    for connection in connection_usage.top(list(iter_config_connections(config)), limit):
+        socketio.start_background_task(prewarm_connection, connection)
+atexit.register(connection_pool.close_all)
 
 # 修改 read_output 函数
+def read_channel_burst(channel):
+    """读取通道中当前可用的数据，突发输出时在短时间内合并为一帧
+
+    返回 (data, closed)，closed 表示通道已到达 EOF。
+    """
+    buffer = bytearray()
+    deadline = None
+    while len(buffer) < OUTPUT_READ_SIZE:
+        try:
+            data = channel.recv(OUTPUT_READ_SIZE - len(buffer))
+        except socket.timeout:
+            data = None
+
+        if data == b'':
+            return bytes(buffer), True
+
+        if data:
+            buffer += data
+            continue
+
+        # 少量输出（如按键回显）立即发送，不额外等待
+        if len(buffer) < OUTPUT_BURST_THRESHOLD:
+            break
+
+        if deadline is None:
+            deadline = time.time() + OUTPUT_FLUSH_INTERVAL
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        readable, _, _ = select.select([channel], [], [], remaining)
+        if not readable:
+            break
+
+    return bytes(buffer), False
+
+class SocketIOOutputSink:
+    """将终端输出记入回滚缓冲并推送到会话房间"""
+    def output(self, session_id, session, data: bytes):
+        session.bytes_out += len(data)
+        session.last_activity = time.time()
+        seq = session.scrollback.append(data)
+        output = session.encode_output(data)
+        if frame_logger.isEnabledFor(logging.DEBUG):
+            frame_logger.debug(f"Sending output for session {session_id}: {len(data)} bytes, seq {seq}")
+        if output:
+            # 二进制模式下 bytes 作为 Socket.IO 二进制附件发送，不经过 JSON
+            socketio.emit('ssh_output', {
+                'session_id': session_id,
+                'output': output,
+                'binary': session.output_mode == 'binary',
+                'seq': seq
+            }, room=session_room(session_id))
+
+    def closed(self, session_id):
+        # close_ssh 主动关闭的会话已从注册表移除并单独通知，这里只处理远端关闭
+        session = session_registry.get(session_id)
+        if session:
+            session.active = False
+            session.stop_input()
+            socketio.emit('ssh_closed', {
+                'session_id': session_id,
+                'message': 'Connection closed'
+            }, room=session_room(session_id))
+
+# 终端输出的去向，会话工作进程中替换为转发给前端进程
+output_sink = SocketIOOutputSink()
+
 def read_output(session_id, channel):
     try:
-        print(f"Starting read thread for session {session_id}")
+        terminal_logger.debug(f"Starting read thread for session {session_id}")
+        session = session_registry.get(session_id)
+        if not session:
+            return
+
         last_activity = time.time()
-        
-        while True:
-            with sessions_lock:
-                if session_id not in ssh_sessions or not ssh_sessions[session_id].active:
-                    break
-            
+
+        while session.active:
             try:
-                if channel.recv_ready():
-                    data = channel.recv(1024)
-                    if data:
-                        try:
-                            text = data.decode('utf-8', errors='ignore')
-                            print(f"Sending output for session {session_id}: {text[:100]}")
-                            socketio.emit('ssh_output', {
-                                'session_id': session_id,
-                                'output': text
-                            })
-                            last_activity = time.time()  # 更新最后活动时间
-                        except Exception as e:
-                            print(f"Error processing output: {e}")
-                else:
+                # 客户端渲染跟不上时暂停读取，直到确认量回落到低水位，与 ack_output 的恢复条件一致
+                if session.flow_control and session.unacked_bytes() > FLOW_HIGH_WATERMARK:
+                    session.flow_resume.clear()
+                    while session.active and session.unacked_bytes() > FLOW_LOW_WATERMARK:
+                        session.flow_resume.wait(1)
+                    continue
+
+                # 等待通道可读，有数据时立即唤醒，空闲时最多等到下一次保活
+                timeout = max(0, last_activity + CHANNEL_KEEPALIVE_INTERVAL - time.time())
+                readable, _, _ = select.select([channel], [], [], timeout)
+
+                if not readable:
                     # 每 60 秒发送一次保活信号
-                    current_time = time.time()
-                    if current_time - last_activity > 60:
-                        try:
-                            channel.send('\x00')  # 发送空字节作为保活信号
-                            last_activity = current_time
-                        except Exception as e:
-                            print(f"Error sending keepalive: {e}")
-                            break
-                    
-                    socketio.sleep(0.1)  # 增加睡眠时间，减少 CPU 使用
-                
+                    try:
+                        channel.send('\x00')  # 发送空字节作为保活信号
+                        last_activity = time.time()
+                    except Exception as e:
+                        terminal_logger.error(f"Error sending keepalive: {e}")
+                        break
+                    continue
+
+                data, closed = read_channel_burst(channel)
+                if data:
+                    try:
+                        output_sink.output(session_id, session, data)
+                        last_activity = time.time()  # 更新最后活动时间
+                    except Exception as e:
+                        terminal_logger.error(f"Error processing output: {e}")
+
                 # 检查通道状态
-                if channel.closed or not channel.get_transport() or not channel.get_transport().is_active():
-                    print(f"Channel closed for session {session_id}")
+                if closed or channel.closed or not channel.get_transport() or not channel.get_transport().is_active():
+                    terminal_logger.info(f"Channel closed for session {session_id}")
                     break
-                    
-            except socket.timeout:
-                continue
+
             except Exception as e:
-                print(f"Error reading from channel: {e}")
+                terminal_logger.error(f"Error reading from channel: {e}")
                 break
-                
+
     except Exception as e:
-        print(f"Error in read_output for session {session_id}: {e}")
+        terminal_logger.error(f"Error in read_output for session {session_id}: {e}")
     finally:
-        print(f"Read thread ending for session {session_id}")
-        with sessions_lock:
-            if session_id in ssh_sessions:
-                ssh_sessions[session_id].active = False
-        socketio.emit('ssh_closed', {
-            'session_id': session_id,
-            'message': 'Connection closed'
-        })
+        terminal_logger.debug(f"Read thread ending for session {session_id}")
+        output_sink.closed(session_id)
+
+def channel_send_all(channel, data: bytes):
+    """向非阻塞通道完整写入数据，发送窗口已满时让出协程等待"""
+    while data:
+        try:
+            sent = channel.send(data)
+        except socket.timeout:
+            socketio.sleep(0.005)
+            continue
+        if sent <= 0:
+            raise IOError('Channel closed')
+        data = data[sent:]
+
+def write_input(session_id, session):
+    """将输入队列中积压的按键和粘贴内容合并后写入通道"""
+    try:
+        while session.active:
+            item = session.input_queue.get()
+            if item is None:
+                break
+
+            # 取出队列中已积压的输入，合并为一次发送
+            batch = [item]
+            size = len(item)
+            stopping = False
+            while size < INPUT_BATCH_BYTES:
+                try:
+                    item = session.input_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                size += len(item)
+
+            data = b''.join(batch)
+            channel_send_all(session.channel, data)
+            session.bytes_in += len(data)
+            session.last_activity = time.time()
+            if stopping:
+                break
+    except Exception as e:
+        terminal_logger.error(f"Error writing input for session {session_id}: {e}")
+        if session.active:
+            socketio.emit('ssh_error', {
+                'session_id': session_id,
+                'error': str(e)
+            }, room=session_room(session_id))
+
+def describe_connect_error(e: Exception) -> Tuple[str, str]:
+    """将建立连接时的异常转换为 (错误类型, 提示信息)"""
+    if isinstance(e, ConnectionError):
+        return 'network', f'Network Connection Failed: {str(e)}'
+    if isinstance(e, paramiko.AuthenticationException):
+        return 'auth', 'Authentication Failed: Invalid username, password or key'
+    return 'unknown', f'Connection failed: {str(e)}'
+
+def create_local_session(session_id, ssh, channel, data, client_id=None) -> SSHSession:
+    """为已打开的通道创建会话并注册，读写线程由调用方启动"""
+    read_thread = threading.Thread(
+        target=read_output,
+        args=(session_id, channel),
+        daemon=True
+    )
+    session = SSHSession(ssh, channel, read_thread)
+    session.client_id = client_id
+    session.connection_key = SSHConnectionPool.connection_key(data)
+    if data.get('output_mode') in OUTPUT_MODES:
+        session.output_mode = data['output_mode']
+    session.flow_control = bool(data.get('flow_control'))
+    session.write_thread = threading.Thread(
+        target=write_input,
+        args=(session_id, session),
+        daemon=True
+    )
+    session_registry.add(session_id, session)
+    return session
 
 @socketio.on('open_ssh')
 def handle_ssh_connection(data):
     try:
         client_id = request.sid
         session_id = data['session_id']
-        print(f"Opening SSH connection for session {session_id} from client {client_id}")
+        terminal_logger.info(f"Opening SSH connection for session {session_id} from client {client_id}")
         
-        try:
-            # 创建新的 SSH 客户端和通道
-            ssh, channel = create_ssh_client(data)
-        except ConnectionError as conn_err:
-            socketio.emit('ssh_error', {
-                'session_id': session_id,
-                'error': f'Network Connection Failed: {str(conn_err)}',
-                'type': 'network'
-            }, room=client_id)
-            return
-        except paramiko.AuthenticationException:
-            socketio.emit('ssh_error', {
-                'session_id': session_id,
-                'error': 'Authentication Failed: Invalid username, password or key',
-                'type': 'auth'
-            }, room=client_id)
-            return
-        except Exception as e:
+        if not session_lifecycle.reserve(session_id):
             socketio.emit('ssh_error', {
                 'session_id': session_id,
-                'error': f'Connection failed: {str(e)}',
-                'type': 'unknown'
+                'error': f'Too many sessions (limit {session_lifecycle.max_sessions})',
+                'type': 'limit'
             }, room=client_id)
             return
         
         try:
-            # 创建并启动读取线程
-            read_thread = threading.Thread(
-                target=read_output,
-                args=(session_id, channel),
-                daemon=True
-            )
-            
-            # 创建新的会话对象
-            session = SSHSession(ssh, channel, read_thread)
-            session.client_id = client_id
+            # 启用会话工作进程时，SSH 连接和加解密在工作进程中进行
+            worker = session_workers.pick()
+            if worker:
+                open_worker_session(worker, client_id, session_id, data)
+                return
+        
+            ssh = None
+            try:
+                # 创建新的 SSH 客户端和通道
+                ssh, channel = create_ssh_client(data)
+            except Exception as e:
+                error_type, message = describe_connect_error(e)
+                socketio.emit('ssh_error', {
+                    'session_id': session_id,
+                    'error': message,
+                    'type': error_type
+                }, room=client_id)
+                return
+        
+            try:
+                session = create_local_session(session_id, ssh, channel, data, client_id)
             
-            # 安全地存储会话
-            with sessions_lock:
-                ssh_sessions[session_id] = session
-                if client_id not in client_sessions:
-                    client_sessions[client_id] = set()
-                client_sessions[client_id].add(session_id)
+                # 属主加入会话房间，输出只发送给房间内的客户端
+                join_room(session_room(session_id))
             
-            # 先读取线程
-            read_thread.start()
+                # 先读取线程
+                session.start()
             
-            # 等待一小段时间确保通道准备就绪
-            socketio.sleep(0.1)
+                # 等待一小段时间确保通道准备就绪
+                socketio.sleep(0.1)
             
-            # 发送连接成功消息
-            socketio.emit('ssh_connected', {
-                'session_id': session_id,
-                'message': 'Connected successfully'
-            }, room=client_id)
+                # 发送连接成功消息
+                socketio.emit('ssh_connected', {
+                    'session_id': session_id,
+                    'message': 'Connected successfully'
+                }, room=client_id)
             
-            print(f"SSH connection established for session {session_id}")
+                terminal_logger.info(f"SSH connection established for session {session_id}")
+                connection_usage.record(data)
             
-        except Exception as e:
-            print(f"Error in session initialization: {e}")
-            if ssh:
-                ssh.close()
-            socketio.emit('ssh_error', {
-                'session_id': session_id,
-                'error': f'Session initialization error: {str(e)}'
-            }, room=client_id)
-            return
+            except Exception as e:
+                terminal_logger.error(f"Error in session initialization: {e}")
+                if ssh:
+                    ssh.close()
+                socketio.emit('ssh_error', {
+                    'session_id': session_id,
+                    'error': f'Session initialization error: {str(e)}'
+                }, room=client_id)
+                return
             
+        finally:
+            # 会话已注册或连接失败，释放占用的名额
+            session_lifecycle.release(session_id)
+
     except Exception as e:
-        print(f"Error establishing SSH connection: {e}")
+        terminal_logger.error(f"Error establishing SSH connection: {e}")
         socketio.emit('ssh_error', {
             'session_id': session_id,
             'error': f'Connection error: {str(e)}'
@@ -444,79 +1485,140 @@ def handle_ssh_input(data):
         session_id = data['session_id']
         input_data = data['input']
         
-        print(f"Received input for session {session_id}: {input_data.encode()}")
+        # 注册表读取不加锁，输入路径不会与其他会话互相阻塞
+        session = session_registry.get(session_id)
+        if not session or not session.active:
+            raise Exception('Session not found or inactive')
+        if session.client_id != client_id:
+            raise Exception('Session belongs to another client')
         
-        with sessions_lock:
-            session = ssh_sessions.get(session_id)
-            if not session or not session.active:
-                raise Exception('Session not found or inactive')
-            if session.client_id != client_id:
-                raise Exception('Session belongs to another client')
-            
-            with session.lock:
-                # 直接发送输入到服务器，让服务器处理回显
-                session.channel.send(input_data)
-                print(f"Input sent to channel for session {session_id}")
-                
+        # 交给写线程合并发送，服务器负责回显
+        if isinstance(input_data, str):
+            input_data = input_data.encode('utf-8')
+        if frame_logger.isEnabledFor(logging.DEBUG):
+            frame_logger.debug(f"Received input for session {session_id}: {len(input_data)} bytes")
+        session.input_queue.put(input_data)
+
     except Exception as e:
-        print(f"Error handling SSH input: {e}")
+        terminal_logger.error(f"Error handling SSH input: {e}")
         socketio.emit('ssh_error', {
             'session_id': session_id,
             'error': str(e)
-        })
+        }, room=request.sid)
 
 @socketio.on('close_ssh')
 def handle_ssh_close(data):
     try:
         client_id = request.sid
         session_id = data['session_id']
-        print(f"Closing SSH session {session_id} for client {client_id}")
+        terminal_logger.info(f"Closing SSH session {session_id} for client {client_id}")
         
-        with sessions_lock:
-            if session_id in ssh_sessions:
-                session = ssh_sessions[session_id]
-                if session.client_id == client_id:  # 验证会话所有权
-                    session.active = False
-                    with session.lock:
-                        try:
-                            session.channel.close()
-                            session.ssh_client.close()
-                        except:
-                            pass
-                    
-                    del ssh_sessions[session_id]
-                    if client_id in client_sessions:
-                        client_sessions[client_id].remove(session_id)
-                    
-                    socketio.emit('ssh_closed', {
-                        'session_id': session_id,
-                        'message': 'Connection closed'
-                    })
-                    print(f"Session {session_id} closed successfully")
-                else:
-                    print(f"Session {session_id} belongs to another client")
+        session = session_registry.get(session_id)
+        if session:
+            if session.client_id == client_id:  # 验证会话所有权
+                close_session(session_id)
+                terminal_logger.info(f"Session {session_id} closed successfully")
             else:
-                print(f"Session {session_id} not found")
+                terminal_logger.warning(f"Session {session_id} belongs to another client")
+        else:
+            terminal_logger.warning(f"Session {session_id} not found")
     except Exception as e:
-        print(f"Error closing session {session_id}: {e}")
+        terminal_logger.error(f"Error closing session {session_id}: {e}")
         socketio.emit('ssh_error', {
             'session_id': session_id,
             'error': str(e)
-        })
+        }, room=request.sid)
+
+@socketio.on('reattach_ssh')
+def handle_ssh_reattach(data):
+    """客户端重连后接管原有会话，并回放 since 序号之后的输出"""
+    client_id = request.sid
+    session_id = data.get('session_id')
+    try:
+        since = int(data.get('since', 0))
+    except (TypeError, ValueError):
+        since = 0
+
+    session = session_registry.get(session_id)
+    if session and session.active:
+        # 将会话重新绑定到新的客户端
+        session_registry.bind_client(session_id, client_id)
+    else:
+        socketio.emit('ssh_reattach_failed', {
+            'session_id': session_id,
+            'error': 'Session not found or inactive'
+        }, room=client_id)
+        return
+
+    if data.get('output_mode') in OUTPUT_MODES:
+        session.output_mode = data['output_mode']
+    if 'flow_control' in data:
+        session.flow_control = bool(data['flow_control'])
+    session.release_flow()
+
+    join_room(session_room(session_id))
+
+    start, replay = session.scrollback.read_since(since)
+    binary = session.output_mode == 'binary'
+    socketio.emit('ssh_reattached', {
+        'session_id': session_id,
+        'output': replay if binary else replay.decode('utf-8', errors='replace'),
+        'binary': binary,
+        'seq': start + len(replay),
+        'truncated': start > since
+    }, room=client_id)
+    terminal_logger.info(f"Session {session_id} reattached to client {client_id}, replayed {len(replay)} bytes")
+
+@socketio.on('ssh_ack')
+def handle_ssh_ack(data):
+    """客户端确认已渲染到的输出序号"""
+    session = session_registry.get(data.get('session_id'))
+    if not session or session.client_id != request.sid:
+        return
+    try:
+        session.ack_output(int(data.get('seq', 0)))
+    except (TypeError, ValueError):
+        pass
+
+@socketio.on('attach_ssh')
+def handle_ssh_attach(data):
+    """以查看者身份附加到已有会话，接收其输出但不能发送输入"""
+    client_id = request.sid
+    session_id = data.get('session_id')
+    session = session_registry.get(session_id)
+    if not session or not session.active:
+        socketio.emit('ssh_error', {
+            'session_id': session_id,
+            'error': 'Session not found or inactive'
+        }, room=client_id)
+        return
+
+    join_room(session_room(session_id))
+    socketio.emit('ssh_attached', {
+        'session_id': session_id,
+        'output_mode': session.output_mode
+    }, room=client_id)
+
+@socketio.on('detach_ssh')
+def handle_ssh_detach(data):
+    """停止接收会话输出，会话本身保持运行"""
+    session_id = data.get('session_id')
+    if session_id:
+        leave_room(session_room(session_id))
 
 @socketio.on('resize')
 def handle_resize(data):
     """处理终端大小调整请求"""
     try:
         session_id = data.get('session_id')
-        if not session_id or session_id not in ssh_sessions:
+        session = session_registry.get(session_id) if session_id else None
+        if not session:
             return
             
         # 获取新的终端大小
         cols = max(80, min(data.get('cols', 80), 500))  # 限制范围
         rows = max(24, min(data.get('rows', 24), 200))  # 限制行范围
         
-        session = ssh_sessions[session_id]
         channel = session.channel
         
         # 调整终端大小
@@ -543,8 +1645,7 @@ def list_directory():
         path = data['path']
         show_hidden = data.get('showHidden', True)
 
-        ssh, sftp = create_sftp_client(connection)
-        try:
+        with connection_pool.sftp(connection, data.get('sessionId')) as sftp:
             items = []
             for item in sftp.listdir_attr(path):
                 if not show_hidden and item.filename.startswith('.'):
@@ -562,9 +1663,6 @@ def list_directory():
                     'isHidden': item.filename.startswith('.')
                 })
             return jsonify(items)
-        finally:
-            sftp.close()
-            ssh.close()
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -619,6 +1717,12 @@ class TransferProgress:
                 self._last_update_time = current_time
                 self._last_size = self.current_size
 
+    def resume_from(self, offset: int):
+        """断点续传时把已完成的部分计入进度，但不计入速度"""
+        with self._lock:
+            self.current_size = self._last_size = offset
+            self.progress = (offset / self.total_size) * 100 if self.total_size > 0 else 0
+
     def cancel(self):
         """标记传输为已取消状态"""
         with self._lock:
@@ -640,6 +1744,11 @@ class TransferProgress:
                 'total': self.format_size(self.total_size),
                 'status': self.status  # 添加状态信息
             }
+            if self.operation == 'delete':
+                # 删除按条目计数，不是字节数
+                status_data['speed'] = f"{self.speed:.0f} items/s"
+                status_data['transferred'] = str(self.current_size)
+                status_data['total'] = str(self.total_size)
             return status_data
 
     @staticmethod
@@ -715,12 +1824,40 @@ class TransferManager:
 # 创建全局传输管理器实例
 transfer_manager = TransferManager()
 
+UPLOAD_TEMP_TTL = 24 * 3600  # 未完成上传的临时文件保留时间，期间可以续传
+
+def purge_stale_uploads(temp_dir: str):
+    """删除超过保留时间的未完成上传临时文件"""
+    cutoff = time.time() - UPLOAD_TEMP_TTL
+    for name in os.listdir(temp_dir):
+        file_path = os.path.join(temp_dir, name)
+        try:
+            if os.path.getmtime(file_path) < cutoff:
+                os.unlink(file_path)
+        except OSError:
+            pass
+
 # 修改上传文件的路由
+def append_upload_chunk(temp_file_path: str, content: str, offset: Optional[int] = None) -> int:
+    """解码一个 base64 数据块并追加到临时文件，返回文件当前大小
+
+    指定 offset 时先把临时文件截断到该位置，重发中断的块不会产生重复数据。
+    分段解码：b64decode 执行期间持有 GIL，整块解码会让事件循环停顿数十毫秒。
+    """
+    step = 1024 * 1024  # 4 的倍数，分段边界不会截断编码单元
+    with open(temp_file_path, 'ab') as f:
+        if offset is not None:
+            f.truncate(offset)
+        for start in range(0, len(content), step):
+            f.write(base64.b64decode(content[start:start + step]))
+        return f.tell()
+
 @app.route('/sftp_upload_file', methods=['POST'])
 def upload_file():
     temp_file_path = None
     try:
-        data = request.json
+        # 大块 base64 请求体的 JSON 解析放到线程池中进行
+        data = blocking_executor.run(json.loads, request.get_data())
         connection = data['connection']
         path = data['path']
         filename = data['filename']
@@ -730,12 +1867,16 @@ def upload_file():
         temp_file_id = data.get('tempFileId')
         transfer_id = data.get('transferId')
         total_size = data.get('totalSize', 0)
+        offset = data.get('offset')
 
-        # 获取或创建传输进度跟踪器
+        # 获取或创建传输进度跟踪器，续传时进度记录可能已随上次失败移除
         if chunk_index == 0:
             transfer_progress = transfer_manager.create_transfer(transfer_id, total_size, 'upload')
         else:
             transfer_progress = transfer_manager.get_transfer(transfer_id)
+            if transfer_progress is None and offset is not None:
+                transfer_progress = transfer_manager.create_transfer(transfer_id, total_size, 'upload')
+                transfer_progress.resume_from(offset)
 
         if transfer_progress and transfer_progress.is_cancelled():
             # 如果传输已被取消，立即返回
@@ -745,23 +1886,20 @@ def upload_file():
         os.makedirs(temp_dir, exist_ok=True)
 
         try:
-            ssh, sftp = create_sftp_client(connection)
-            try:
+            with connection_pool.sftp(connection, data.get('sessionId')) as sftp:
                 if chunk_index == 0:
+                    purge_stale_uploads(temp_dir)
                     temp_file_id = str(uuid.uuid4())
                     temp_file_path = os.path.join(temp_dir, temp_file_id)
                 else:
-                    temp_file_path = os.path.join(temp_dir, temp_file_id)
+                    temp_file_path = os.path.join(temp_dir, os.path.basename(temp_file_id))
 
                 # 解码并写入当前块
                 if content:
-                    chunk_data = base64.b64decode(content)
-                    with open(temp_file_path, 'ab') as f:
-                        f.write(chunk_data)
+                    current_size = blocking_executor.run(append_upload_chunk, temp_file_path, content, offset)
                     
                     # 更新进度并检查是否取消
                     if transfer_progress:
-                        current_size = os.path.getsize(temp_file_path)
                         transfer_progress.update(current_size)
                         if transfer_progress.is_cancelled():
                             raise Exception("Transfer cancelled")
@@ -801,20 +1939,19 @@ def upload_file():
                     "tempFileId": temp_file_id
                 })
 
-            finally:
-                sftp.close()
-                ssh.close()
-
         except Exception as e:
             if "Transfer cancelled" in str(e):
                 # 传输被取消的情况
+                if os.path.exists(temp_file_path):
+                    os.unlink(temp_file_path)
                 return jsonify({"status": "cancelled", "message": "Transfer cancelled"}), 200
             raise
 
     except Exception as e:
         logger.error(f"Upload error: {str(e)}")
-        # 清理临时文件
-        if temp_file_path and os.path.exists(temp_file_path):
+        # 已收到的块保留在临时文件中，客户端可以带 tempFileId 和 offset 重发后续块；
+        # 首块失败时还没有返回 tempFileId，临时文件无法续传
+        if temp_file_path and chunk_index == 0 and os.path.exists(temp_file_path):
             try:
                 os.unlink(temp_file_path)
             except:
@@ -824,88 +1961,1064 @@ def upload_file():
             transfer_manager.remove_transfer(transfer_id)
         return jsonify({"error": str(e)}), 500
 
+UPLOAD_READ_SIZE = 256 * 1024  # 从请求体读取、写入远程文件的块大小
+
+def parse_upload_meta() -> dict:
+    """解析 X-Upload-Meta 请求头（UTF-8 JSON 的 base64 编码）"""
+    header = request.headers.get('X-Upload-Meta')
+    if not header:
+        raise ValueError("Missing X-Upload-Meta header")
+    return json.loads(base64.b64decode(header).decode('utf-8'))
+
+@app.route('/sftp_upload_stream', methods=['POST'])
+def upload_stream():
+    """原始字节流上传：请求体为文件内容，边读边以流水线方式写入远程文件
+
+    不经过 base64 和本地临时文件，内存占用与文件大小无关。
+    X-Upload-Meta 中的 offset 表示请求体从文件的哪个位置开始，用于断点续传，
+    必须等于远程文件的当前大小（可先通过 /sftp_upload_offset 查询）；
+    提供 checksum 时上传完成后校验远程文件的摘要。
+    """
+    transfer_id = None
+    try:
+        meta = parse_upload_meta()
+        connection = meta['connection']
+        remote_path = os.path.join(meta['path'], meta['filename']).replace('\\', '/')
+        offset = int(meta.get('offset') or 0)
+        transfer_id = meta.get('transferId') or str(uuid.uuid4())
+        total_size = meta.get('totalSize') or offset + (request.content_length or 0)
+        transfer_progress = transfer_manager.create_transfer(transfer_id, total_size, 'upload')
+        transfer_progress.resume_from(offset)
+
+        received = 0
+        with connection_pool.sftp(connection, meta.get('sessionId')) as sftp:
+            if offset:
+                remote_size = remote_file_size(sftp, remote_path)
+                if remote_size != offset:
+                    return jsonify({"error": "Upload offset does not match remote file size",
+                                    "offset": remote_size}), 409
+                remote_file = sftp.open(remote_path, 'r+')
+                remote_file.seek(offset)
+            else:
+                remote_file = sftp.open(remote_path, 'wb')
+            try:
+                # 不等待每个写请求的确认，写入错误在 close 时统一抛出
+                remote_file.set_pipelined(True)
+                while True:
+                    block = request.stream.read(UPLOAD_READ_SIZE)
+                    if not block:
+                        break
+                    remote_file.write(block)
+                    received += len(block)
+                    transfer_progress.update(offset + received)
+                    if transfer_progress.is_cancelled():
+                        raise Exception("Transfer cancelled")
+                if request.content_length is not None and received != request.content_length:
+                    raise Exception(f"Upload incomplete: received {received} of {request.content_length} bytes")
+                remote_file.close()
+            except Exception as e:
+                try:
+                    remote_file.close()
+                except Exception:
+                    pass
+                # 连接中断时保留已写入的部分供续传；取消时只删除本次新建的文件，
+                # 续传时已有的内容来自之前的尝试，保留给客户端决定
+                if "Transfer cancelled" in str(e) and offset == 0:
+                    try:
+                        sftp.remove(remote_path)
+                    except Exception:
+                        pass
+                raise
+
+        result = {"status": "success"}
+        if meta.get('checksum'):
+            algorithm = meta.get('checksumAlgorithm') or 'sha256'
+            checksum = remote_checksum(connection, remote_path, algorithm, meta.get('sessionId'))
+            if checksum != meta['checksum'].lower():
+                logger.error(f"Checksum mismatch for {remote_path}: expected {meta['checksum']}, got {checksum}")
+                return jsonify({"error": "Checksum mismatch", "checksum": checksum}), 422
+            result['checksum'] = checksum
+
+        log_sftp_operation('upload', remote_path)
+        return jsonify(result)
+
+    except Exception as e:
+        if "Transfer cancelled" in str(e):
+            return jsonify({"status": "cancelled", "message": "Transfer cancelled"}), 200
+        logger.error(f"Stream upload error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if transfer_id:
+            transfer_manager.remove_transfer(transfer_id)
+
+def remote_file_size(sftp, remote_path) -> int:
+    """远程文件的大小，文件不存在时返回 0"""
+    try:
+        return sftp.stat(remote_path).st_size
+    except FileNotFoundError:
+        return 0
+
+@app.route('/sftp_upload_offset', methods=['POST'])
+def upload_offset():
+    """返回远程文件已有的大小，作为续传的起点"""
+    try:
+        data = request.json
+        remote_path = os.path.join(data['path'], data['filename']).replace('\\', '/')
+        with connection_pool.sftp(data['connection'], data.get('sessionId')) as sftp:
+            return jsonify({"offset": remote_file_size(sftp, remote_path)})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# 下载引擎默认参数，可在 settings 或单次请求中覆盖
+DOWNLOAD_CHUNK_SIZE = 32768      # 单个 SFTP 读请求的大小
+DOWNLOAD_CONCURRENCY = 64        # 每个分段同时在途的读请求数
+DOWNLOAD_STREAMS = 1             # 并行使用的 SFTP 通道数
+DOWNLOAD_SEGMENTS_PER_STREAM = 2 # 每个通道同时读取的分段数，使相邻分段的往返时间重叠
+
+def transfer_option(data, settings, key, default, minimum=1, maximum=None) -> int:
+    """按 请求参数 > settings > 默认值 的顺序读取整数传输参数"""
+    value = data.get(key)
+    if value is None:
+        value = settings.get('download' + key[0].upper() + key[1:], default)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        value = default
+    value = max(minimum, value)
+    return min(value, maximum) if maximum else value
+
+class SFTPDownloadEngine:
+    """并发读取远程文件并按顺序输出数据块
+
+    文件被划分为 chunk_size * concurrency 大小的分段，每个分段用 readv 一次性发出全部读请求；
+    多个协程同时读取不同分段，可分布在多个 SFTP 通道上。消费者按顺序取出分段，
+    领先消费者的分段数有上限，内存占用与文件大小无关。
+    """
+    def __init__(self, connection, path, session_id=None, chunk_size=DOWNLOAD_CHUNK_SIZE,
+                 concurrency=DOWNLOAD_CONCURRENCY, streams=DOWNLOAD_STREAMS):
+        self.connection = connection
+        self.path = path
+        self.session_id = session_id
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.streams = streams
+        self.segment_size = chunk_size * concurrency
+        self._channels = []  # [(owner, sftp)]
+        self._files = []
+        self.size = None
+        self.mtime = None
+        self.completed = False  # 全部数据已按顺序输出，通道可以复用
+
+    def open(self, sftp=None, owner=None):
+        """打开 SFTP 通道，可传入调用方已打开的通道作为第一个"""
+        if sftp is None:
+            owner, sftp = connection_pool.open_sftp(self.connection, self.session_id)
+            self._channels.append((owner, sftp))
+        self._primary = sftp
+        attrs = sftp.stat(self.path)
+        self.size = attrs.st_size
+        self.mtime = attrs.st_mtime
+        stripes = [sftp]
+        for _ in range(1, self.streams):
+            try:
+                extra_owner, extra = connection_pool.open_sftp(self.connection)
+            except Exception as e:
+                logger.warning(f"Failed to open extra download stream: {e}")
+                break
+            self._channels.append((extra_owner, extra))
+            stripes.append(extra)
+        self._stripes = stripes
+        return self
+
+    def _open_file(self, sftp):
+        remote_file = sftp.open(self.path, 'rb')
+        remote_file.MAX_REQUEST_SIZE = self.chunk_size
+        self._files.append(remote_file)
+        return remote_file
+
+    def blocks(self, start=0, end=None, cancelled=None):
+        """按顺序产出 [start, end) 范围内的数据块，每块最多一个分段"""
+        end = self.size if end is None else min(end, self.size)
+        if start >= end:
+            return
+        # 第一个分段只含一个读请求，首字节在一次往返后即可输出
+        first = min(self.chunk_size, end - start)
+        segments = [(start, first)] + [(offset, min(self.segment_size, end - offset))
+                                       for offset in range(start + first, end, self.segment_size)]
+        results = {}
+        ready = threading.Event()
+        errors = []
+        next_index = [0]
+        consumed = [0]
+        max_ahead = len(self._stripes) * DOWNLOAD_SEGMENTS_PER_STREAM + 1
+        stopping = [False]
+
+        def fetch(sftp):
+            # 各协程并发打开自己的文件句柄，节省串行打开的往返
+            try:
+                remote_file = self._open_file(sftp)
+            except Exception as e:
+                errors.append(e)
+                ready.set()
+                return
+            while not stopping[0]:
+                index = next_index[0]
+                if index >= len(segments):
+                    return
+                # 领先消费者过多时等待，限制缓冲的分段数
+                if index - consumed[0] >= max_ahead:
+                    socketio.sleep(0.005)
+                    continue
+                next_index[0] += 1
+                offset, length = segments[index]
+                try:
+                    data = b''.join(remote_file.readv(
+                        [(offset, length)], max_concurrent_prefetch_requests=self.concurrency))
+                except Exception as e:
+                    errors.append(e)
+                    ready.set()
+                    return
+                results[index] = data
+                ready.set()
+
+        workers = []
+        for sftp in self._stripes:
+            for _ in range(DOWNLOAD_SEGMENTS_PER_STREAM):
+                workers.append(socketio.start_background_task(fetch, sftp))
+        try:
+            for index in range(len(segments)):
+                while index not in results:
+                    if errors:
+                        raise errors[0]
+                    if cancelled and cancelled():
+                        raise Exception("Transfer cancelled")
+                    ready.clear()
+                    if index not in results and not errors:
+                        ready.wait(1)
+                data = results.pop(index)
+                consumed[0] = index + 1
+                yield data
+            self.completed = True
+        finally:
+            stopping[0] = True
+            for worker in workers:
+                worker.join(timeout=5)
+
+    def close(self):
+        for remote_file in self._files:
+            try:
+                remote_file.close()
+            except Exception:
+                pass
+        self._files = []
+        for owner, sftp in self._channels:
+            connection_pool.close_sftp(owner, sftp, reuse=self.completed)
+        self._channels = []
+
+def create_download_engine(data, path) -> SFTPDownloadEngine:
+    settings = load_settings()
+    return SFTPDownloadEngine(
+        data['connection'], path, data.get('sessionId'),
+        chunk_size=transfer_option(data, settings, 'chunkSize', DOWNLOAD_CHUNK_SIZE, 4096, 256 * 1024),
+        concurrency=transfer_option(data, settings, 'concurrency', DOWNLOAD_CONCURRENCY, 1, 1024),
+        streams=transfer_option(data, settings, 'streams', DOWNLOAD_STREAMS, 1, CONNECTION_POOL_MAX_CHANNELS)
+    )
+
 # 修改下载文件的路由
 @app.route('/sftp_download_file', methods=['POST'])
 def download_file():
-    temp_file = None
     try:
         data = request.json
         connection = data['connection']
         path = data['path']
         transfer_id = data.get('transferId')
 
-        ssh, sftp = create_sftp_client(connection)
-        try:
-            file_size = sftp.stat(path).st_size
-            transfer_progress = transfer_manager.create_transfer(transfer_id, file_size, 'download')
+        engine = create_download_engine(data, path)
+        try:
+            engine.open()
+            file_size = engine.size
+            last_modified = datetime.fromtimestamp(engine.mtime or 0, timezone.utc)
+            headers = {
+                'Content-Disposition': f'attachment; filename={os.path.basename(path)}',
+                'Accept-Ranges': 'bytes',
+                'Last-Modified': http_date(last_modified)
+            }
+
+            # 断点续传：只处理单个字节范围；If-Range 与文件修改时间不一致时说明文件已变化，返回完整内容
+            start, end, status = 0, file_size, 200
+            byte_range = request.range
+            if_range = request.if_range.date
+            if byte_range and ('If-Range' not in request.headers
+                               or if_range == last_modified):
+                span = byte_range.range_for_length(file_size)
+                if span is None:
+                    engine.close()
+                    return Response(status=416, headers={'Content-Range': f'bytes */{file_size}'})
+                start, end = span
+                status = 206
+                headers['Content-Range'] = f'bytes {start}-{end - 1}/{file_size}'
+            headers['Content-Length'] = str(end - start)
+
+            transfer_progress = transfer_manager.create_transfer(transfer_id, file_size, 'download')
+            transfer_progress.resume_from(start)
+
+            def generate():
+                # 远程数据块直接写入响应，不经过本地临时文件
+                try:
+                    transferred = start
+                    try:
+                        for block in engine.blocks(start, end, cancelled=transfer_progress.is_cancelled):
+                            transferred += len(block)
+                            transfer_progress.update(transferred)
+                            yield block
+                    except Exception as e:
+                        if transfer_progress.is_cancelled():
+                            raise Exception("Transfer cancelled")
+                        raise e
+
+                except Exception as e:
+                    if "Transfer cancelled" in str(e):
+                        # 传输被取消的情况
+                        yield b''  # 发送空字节以结束响应
+                    else:
+                        raise
+                finally:
+                    transfer_manager.remove_transfer(transfer_id)
+                    engine.close()
+
+            response = Response(
+                generate(),
+                status=status,
+                mimetype='application/octet-stream',
+                headers=headers
+            )
+            return response
+
+        except Exception as e:
+            engine.close()
+            if transfer_id:
+                transfer_manager.remove_transfer(transfer_id)
+            raise
+
+    except Exception as e:
+        if "Transfer cancelled" in str(e):
+            return jsonify({"status": "cancelled", "message": "Transfer cancelled"}), 200
+        return jsonify({"error": str(e)}), 500
+
+CHECKSUM_COMMANDS = {'md5': 'md5sum', 'sha1': 'sha1sum', 'sha256': 'sha256sum', 'sha512': 'sha512sum'}
+
+def remote_checksum(connection, path, algorithm='sha256', session_id=None) -> str:
+    """计算远程文件的摘要
+
+    优先在远程执行 sha256sum 等命令，只传回摘要；命令不可用时通过 SFTP 读取文件在本地计算。
+    """
+    algorithm = algorithm.lower()
+    command = CHECKSUM_COMMANDS.get(algorithm)
+    if command is None:
+        raise ValueError(f"Unsupported checksum algorithm: {algorithm}")
+    digest_length = hashlib.new(algorithm).digest_size * 2
+    try:
+        with connection_pool.client(connection, session_id) as client:
+            _, stdout, _ = client.exec_command(f"{command} -- {shlex.quote(path)}")
+            output = stdout.read().decode('utf-8', 'replace')
+            exit_status = stdout.channel.recv_exit_status()
+        # 文件名含特殊字符时输出行以反斜杠开头
+        digest = output.split()[0].lstrip('\\').lower() if output.strip() else ''
+        if exit_status == 0 and re.fullmatch(f'[0-9a-f]{{{digest_length}}}', digest):
+            return digest
+        logger.debug(f"Remote {command} unavailable for {path}, exit status {exit_status}")
+    except Exception as e:
+        logger.debug(f"Remote {command} failed for {path}: {e}")
+
+    hasher = hashlib.new(algorithm)
+    engine = create_download_engine({'connection': connection, 'sessionId': session_id}, path)
+    try:
+        engine.open()
+        for block in engine.blocks():
+            hasher.update(block)
+    finally:
+        engine.close()
+    return hasher.hexdigest()
+
+@app.route('/sftp_checksum', methods=['POST'])
+def checksum_file():
+    """返回远程文件的摘要，用于校验下载或续传后的文件"""
+    try:
+        data = request.json
+        algorithm = data.get('algorithm') or 'sha256'
+        checksum = remote_checksum(data['connection'], data['path'], algorithm, data.get('sessionId'))
+        return jsonify({"algorithm": algorithm.lower(), "checksum": checksum})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+FOLDER_TRANSFER_WORKERS = 8  # 目录传输时同时工作的 SFTP 通道数
+FOLDER_TRANSFER_MAX_WORKERS = 32
+
+def remote_join(parent, name):
+    return os.path.join(parent, name).replace('\\', '/')
+
+def walk_local_tree(root):
+    """列出本地目录树，返回 (相对目录列表, [(本地路径, 相对路径, 大小)])，父目录排在子目录之前"""
+    directories, files = [], []
+    for current, dirnames, filenames in os.walk(root):
+        relative = os.path.relpath(current, root)
+        relative = '' if relative == '.' else relative.replace('\\', '/')
+        for name in dirnames:
+            directories.append(remote_join(relative, name) if relative else name)
+        for name in filenames:
+            local_path = os.path.join(current, name)
+            if os.path.isfile(local_path):
+                files.append((local_path, remote_join(relative, name) if relative else name,
+                              os.path.getsize(local_path)))
+    return directories, files
+
+TAR_BUFFER_SIZE = 256 * 1024  # tar 流读写缓冲，减少小块的通道收发
+
+class ChannelWriter:
+    """把 tarfile 的写入转发到 exec 通道的标准输入"""
+    def __init__(self, channel):
+        self.channel = channel
+
+    def write(self, data):
+        self.channel.sendall(data)
+        return len(data)
+
+class ProgressReader:
+    """读取本地文件时把读到的字节数报告给回调"""
+    def __init__(self, f, on_read):
+        self.f = f
+        self.on_read = on_read
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        if data:
+            self.on_read(len(data))
+        return data
+
+class ParallelSFTPJob:
+    """把一批远程操作分发给有界的工作协程池
+
+    每个工作协程持有一个 SFTP 通道，通道经连接池分布在共享的 SSH 传输上；
+    单项失败记录到 errors 后继续处理其余项，取消后所有工作协程停止。
+    """
+    def __init__(self, connection, session_id=None, transfer_progress=None, workers=FOLDER_TRANSFER_WORKERS):
+        self.connection = connection
+        self.session_id = session_id
+        self.progress = transfer_progress
+        self.workers = workers
+        self.errors = []
+
+    def cancelled(self) -> bool:
+        return self.progress is not None and self.progress.is_cancelled()
+
+    def run_parallel(self, items, handler):
+        """由最多 workers 个工作协程处理 items，每项的第一个元素是出错时报告的路径"""
+        pending = deque(items)
+
+        def work():
+            owner = sftp = None
+            try:
+                while pending and not self.cancelled():
+                    item = pending.popleft()
+                    try:
+                        if sftp is None:
+                            owner, sftp = connection_pool.open_sftp(self.connection, self.session_id)
+                        handler(sftp, item)
+                    except Exception as e:
+                        if "Transfer cancelled" in str(e):
+                            return
+                        logger.warning(f"{type(self).__name__} failed for {item[0]}: {e}")
+                        self.errors.append({"path": item[0], "error": str(e)})
+                        # 出错的通道上可能还有未处理的响应，换一个新通道
+                        if sftp is not None:
+                            connection_pool.close_sftp(owner, sftp)
+                            owner = sftp = None
+            finally:
+                if sftp is not None:
+                    connection_pool.close_sftp(owner, sftp, reuse=not self.cancelled())
+
+        workers = [socketio.start_background_task(work) for _ in range(min(self.workers, len(pending)))]
+        for worker in workers:
+            worker.join()
+        if self.cancelled():
+            raise Exception("Transfer cancelled")
+
+class FolderTransfer(ParallelSFTPJob):
+    """递归目录传输
+
+    远程有 tar 时优先走 tar 快速路径：整个目录树作为一个 tar 流经 exec 通道传输，
+    边接收边解包，每个文件不再需要单独的 open/write/close 往返。
+    tar 不可用（没有 tar、不允许 exec 或登录 shell 不兼容）时使用 SFTP：
+    只遍历一次目录树，先创建全部目录，再把文件分发给有界的工作协程池；
+    每个工作协程持有一个 SFTP 通道，通道经连接池分布在共享的 SSH 传输上。
+    两种方式的字节数都汇总到同一个 TransferProgress。符号链接不跟随。
+    """
+    def __init__(self, connection, session_id=None, transfer_progress=None, workers=FOLDER_TRANSFER_WORKERS,
+                 use_tar=True):
+        super().__init__(connection, session_id, transfer_progress, workers)
+        self.use_tar = use_tar
+        self.method = 'sftp'
+        self.transferred = 0
+        self.files = 0
+        self.directories = 0
+
+    def _add(self, count):
+        self.transferred += count
+        if self.progress:
+            self.progress.update(self.transferred)
+            if self.progress.is_cancelled():
+                raise Exception("Transfer cancelled")
+
+    def _set_total(self, files):
+        if self.progress:
+            self.progress.total_size = sum(size for _, _, size in files)
+
+    def walk_remote(self, root):
+        """逐层并行列出远程目录树，返回 (相对目录列表, [(远程路径, 相对路径, 大小)])"""
+        directories, files = [], []
+        level = [(root, '')]
+        while level:
+            next_level = []
+
+            def list_directory(sftp, item):
+                remote_path, relative = item
+                for attr in sftp.listdir_attr(remote_path):
+                    child_relative = remote_join(relative, attr.filename) if relative else attr.filename
+                    if stat.S_ISDIR(attr.st_mode):
+                        directories.append(child_relative)
+                        next_level.append((remote_join(remote_path, attr.filename), child_relative))
+                    elif stat.S_ISREG(attr.st_mode):
+                        files.append((remote_join(remote_path, attr.filename), child_relative, attr.st_size))
+
+            self.run_parallel(level, list_directory)
+            level = next_level
+        return directories, files
+
+    def download(self, remote_root, local_root):
+        """把远程目录 remote_root 下载为本地目录 local_root"""
+        with connection_pool.sftp(self.connection, self.session_id) as sftp:
+            if not stat.S_ISDIR(sftp.stat(remote_root).st_mode):
+                raise Exception(f"Not a directory: {remote_root}")
+        if self.use_tar and self._download_tar(remote_root, local_root):
+            return
+        directories, files = self.walk_remote(remote_root)
+        self._set_total(files)
+        os.makedirs(local_root, exist_ok=True)
+        for relative in directories:
+            os.makedirs(os.path.join(local_root, *relative.split('/')), exist_ok=True)
+        self.directories = len(directories)
+        self.run_parallel(
+            [(remote_path, os.path.join(local_root, *relative.split('/')), size)
+             for remote_path, relative, size in files],
+            self._download_file)
+
+    def _download_file(self, sftp, item):
+        remote_path, local_path, size = item
+        remote_file = sftp.open(remote_path, 'rb')
+        try:
+            # 一次发出整个文件的读请求，小文件只需一个往返；
+            # 只读取列目录时得到的大小，不再为确认文件结尾多等一个往返
+            remote_file.prefetch(size)
+            remaining = size
+            with open(local_path, 'wb') as f:
+                while remaining > 0:
+                    data = remote_file.read(min(remaining, DOWNLOAD_CHUNK_SIZE * 8))
+                    if not data:
+                        break
+                    f.write(data)
+                    remaining -= len(data)
+                    self._add(len(data))
+        except Exception:
+            try:
+                os.unlink(local_path)
+            except OSError:
+                pass
+            raise
+        finally:
+            remote_file.close()
+        self.files += 1
+
+    def upload(self, local_root, remote_root):
+        """把本地目录 local_root 上传为远程目录 remote_root"""
+        directories, files = blocking_executor.run(walk_local_tree, local_root)
+        self._set_total(files)
+        if self.use_tar and self._upload_tar(local_root, remote_root, directories, files):
+            return
+        with connection_pool.sftp(self.connection, self.session_id) as sftp:
+            self._ensure_remote_directory(sftp, remote_root)
+        # 同一层的目录互不依赖，逐层并行创建
+        by_depth = {}
+        for relative in directories:
+            by_depth.setdefault(relative.count('/'), []).append((remote_join(remote_root, relative),))
+        for depth in sorted(by_depth):
+            self.run_parallel(by_depth[depth], lambda sftp, item: self._ensure_remote_directory(sftp, item[0]))
+        self.directories = len(directories)
+        self.run_parallel(
+            [(local_path, remote_join(remote_root, relative)) for local_path, relative, _ in files],
+            self._upload_file)
+
+    @staticmethod
+    def _ensure_remote_directory(sftp, remote_path):
+        try:
+            sftp.mkdir(remote_path)
+        except IOError:
+            if not stat.S_ISDIR(sftp.stat(remote_path).st_mode):
+                raise
+
+    def _upload_file(self, sftp, item):
+        local_path, remote_path = item
+        remote_file = sftp.open(remote_path, 'wb')
+        try:
+            # 不等待每个写请求的确认，写入错误在 close 时统一抛出
+            remote_file.set_pipelined(True)
+            with open(local_path, 'rb') as f:
+                while True:
+                    data = f.read(UPLOAD_READ_SIZE)
+                    if not data:
+                        break
+                    remote_file.write(data)
+                    self._add(len(data))
+        finally:
+            remote_file.close()
+        self.files += 1
+
+    def _tar_compression(self, negotiated) -> bool:
+        """连接配置要求压缩、但 SSH 层没有协商出压缩时，由 tar 进行 gzip 压缩，避免重复压缩"""
+        return bool(get_connection_profile(self.connection).get('compression')) and negotiated in (None, 'none')
+
+    @staticmethod
+    def _run_probe(client, command):
+        """执行探测命令，返回 (退出码, 标准输出)"""
+        _, stdout, _ = client.exec_command(command)
+        output = stdout.read().decode('utf-8', 'replace')
+        return stdout.channel.recv_exit_status(), output
+
+    @staticmethod
+    def _member_path(local_root, name):
+        """tar 成员对应的本地路径，拒绝绝对路径和跳出目标目录的成员"""
+        normalized = os.path.normpath(name)
+        if os.path.isabs(normalized) or normalized == '..' or normalized.startswith('..' + os.sep):
+            return None
+        return os.path.join(local_root, normalized)
+
+    def _download_tar(self, remote_root, local_root) -> bool:
+        """远程 tar 打包、本地边接收边解包，tar 不可用时返回 False 以改用 SFTP"""
+        try:
+            with connection_pool.client(self.connection, self.session_id) as client:
+                quoted = shlex.quote(remote_root)
+                status, output = self._run_probe(
+                    client, f"cd -- {quoted} && command -v tar >/dev/null 2>&1 && {{ du -sk . 2>/dev/null || echo 0; }}")
+                if status != 0:
+                    logger.info(f"tar unavailable for {remote_root}, using SFTP")
+                    return False
+                # du 统计的是磁盘占用，只作为进度的估计值
+                if self.progress:
+                    self.progress.total_size = int(output.split()[0]) * 1024 if output.strip() else 0
+
+                compress = self._tar_compression(client.get_transport().remote_compression)
+                channel = client.get_transport().open_session()
+                try:
+                    channel.exec_command(f"tar -C {quoted} -c{'z' if compress else ''}f - .")
+                    os.makedirs(local_root, exist_ok=True)
+                    stream = channel.makefile('rb')
+                    try:
+                        with tarfile.open(fileobj=stream, mode='r|gz' if compress else 'r|',
+                                          bufsize=TAR_BUFFER_SIZE) as archive:
+                            self.method = 'tar'
+                            self._extract(archive, local_root)
+                    except tarfile.ReadError as e:
+                        # 没有收到任何内容时说明 tar 无法运行，改用 SFTP
+                        if self.files == 0 and self.directories == 0:
+                            logger.info(f"tar stream unreadable for {remote_root}, using SFTP: {e}")
+                            self.method = 'sftp'
+                            return False
+                        raise
+                    exit_status = channel.recv_exit_status()
+                    if exit_status != 0:
+                        error = channel.makefile_stderr('rb').read().decode('utf-8', 'replace').strip()
+                        self.errors.append({"path": remote_root, "error": error or f"tar exited with {exit_status}"})
+                finally:
+                    channel.close()
+        except Exception as e:
+            if "Transfer cancelled" in str(e) or self.method == 'tar':
+                raise
+            logger.info(f"tar download unavailable for {remote_root}, using SFTP: {e}")
+            return False
+        if self.progress:
+            self.progress.total_size = self.transferred
+            self.progress.update(self.transferred)
+        return True
+
+    def _extract(self, archive, local_root):
+        for member in archive:
+            target = self._member_path(local_root, member.name)
+            if target is None:
+                self.errors.append({"path": member.name, "error": "Unsafe path in archive"})
+                continue
+            if member.isdir():
+                os.makedirs(target, exist_ok=True)
+                if os.path.normpath(member.name) != '.':
+                    self.directories += 1
+            elif member.isfile():
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                source = archive.extractfile(member)
+                with open(target, 'wb') as f:
+                    while True:
+                        data = source.read(UPLOAD_READ_SIZE)
+                        if not data:
+                            break
+                        f.write(data)
+                        self._add(len(data))
+                self.files += 1
+
+    def _upload_tar(self, local_root, remote_root, directories, files) -> bool:
+        """本地打包为 tar 流写入远程 tar 的标准输入，tar 不可用时返回 False 以改用 SFTP"""
+        try:
+            with connection_pool.client(self.connection, self.session_id) as client:
+                status, _ = self._run_probe(client, "command -v tar >/dev/null 2>&1")
+                if status != 0:
+                    logger.info(f"tar unavailable for {remote_root}, using SFTP")
+                    return False
+                compress = self._tar_compression(client.get_transport().local_compression)
+                channel = client.get_transport().open_session()
+                try:
+                    quoted = shlex.quote(remote_root)
+                    # -o：以远程登录用户的身份创建文件，不使用本地的属主
+                    channel.exec_command(f"mkdir -p -- {quoted} && tar -C {quoted} -x{'z' if compress else ''}of -")
+                    self.method = 'tar'
+                    with tarfile.open(fileobj=ChannelWriter(channel), mode='w|gz' if compress else 'w|',
+                                      bufsize=TAR_BUFFER_SIZE, format=tarfile.PAX_FORMAT) as archive:
+                        for relative in directories:
+                            archive.add(os.path.join(local_root, *relative.split('/')), arcname=relative,
+                                        recursive=False, filter=self._anonymize)
+                        for local_path, relative, _ in files:
+                            info = self._anonymize(archive.gettarinfo(local_path, arcname=relative))
+                            with open(local_path, 'rb') as f:
+                                archive.addfile(info, ProgressReader(f, self._add))
+                            self.files += 1
+                    channel.shutdown_write()
+                    exit_status = channel.recv_exit_status()
+                    if exit_status != 0:
+                        error = channel.makefile_stderr('rb').read().decode('utf-8', 'replace').strip()
+                        self.errors.append({"path": remote_root, "error": error or f"tar exited with {exit_status}"})
+                finally:
+                    channel.close()
+        except Exception as e:
+            if "Transfer cancelled" in str(e) or self.method == 'tar':
+                raise
+            logger.info(f"tar upload unavailable for {remote_root}, using SFTP: {e}")
+            return False
+        self.directories = len(directories)
+        return True
+
+    @staticmethod
+    def _anonymize(info):
+        info.uid = info.gid = 0
+        info.uname = info.gname = ''
+        return info
+
+    def result(self) -> Dict:
+        return {
+            "method": self.method,
+            "status": "partial" if self.errors else "success",
+            "files": self.files,
+            "directories": self.directories,
+            "bytes": self.transferred,
+            "errors": self.errors
+        }
+
+def folder_transfer_workers(data) -> int:
+    """目录传输的并行通道数：请求参数 > settings.folderTransferWorkers > 默认值"""
+    value = data.get('workers') or load_settings().get('folderTransferWorkers', FOLDER_TRANSFER_WORKERS)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        value = FOLDER_TRANSFER_WORKERS
+    return max(1, min(value, FOLDER_TRANSFER_MAX_WORKERS))
+
+def run_folder_transfer(data, operation, run):
+    """执行目录传输并返回响应，进度通过 transferId 查询，可被 /cancel_transfer 取消"""
+    transfer_id = data.get('transferId') or str(uuid.uuid4())
+    transfer_progress = transfer_manager.create_transfer(transfer_id, 0, operation)
+    use_tar = data.get('tar')
+    if use_tar is None:
+        use_tar = load_settings().get('folderTransferTar', True)
+    transfer = FolderTransfer(data['connection'], data.get('sessionId'), transfer_progress,
+                              folder_transfer_workers(data), bool(use_tar))
+    try:
+        run(transfer)
+        return jsonify(transfer.result())
+    except Exception as e:
+        if "Transfer cancelled" in str(e):
+            return jsonify({"status": "cancelled", "message": "Transfer cancelled"}), 200
+        logger.error(f"Folder {operation} error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        transfer_manager.remove_transfer(transfer_id)
+
+def folder_transfer_request() -> dict:
+    """读取目录传输请求体，缺少 connection/path/localPath 时抛出 ValueError"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise ValueError("Request body must be a JSON object")
+    missing = [key for key in ('connection', 'path', 'localPath')
+               if not data.get(key) or (key != 'connection' and not isinstance(data[key], str))]
+    if missing:
+        raise ValueError(f"Missing or invalid fields: {', '.join(missing)}")
+    return data
+
+@app.route('/sftp_download_folder', methods=['POST'])
+def download_folder():
+    """把远程目录 path 递归下载到本地目录 localPath 下"""
+    try:
+        data = folder_transfer_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    remote_path = data['path'].rstrip('/') or '/'
+    local_path = os.path.join(data['localPath'], os.path.basename(remote_path) or 'root')
+
+    def run(transfer):
+        transfer.download(remote_path, local_path)
+        log_sftp_operation('download_folder', remote_path)
+
+    return run_folder_transfer(data, 'download', run)
+
+@app.route('/sftp_upload_folder', methods=['POST'])
+def upload_folder():
+    """把本地目录 localPath 递归上传到远程目录 path 下"""
+    try:
+        data = folder_transfer_request()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    local_path = os.path.normpath(data['localPath'])
+    if not os.path.isdir(local_path):
+        return jsonify({"error": f"Not a directory: {local_path}"}), 400
+    remote_path = remote_join(data['path'], os.path.basename(local_path))
+
+    def run(transfer):
+        transfer.upload(local_path, remote_path)
+        log_sftp_operation('upload_folder', remote_path)
+
+    return run_folder_transfer(data, 'upload', run)
+
+ARCHIVE_FORMATS = {
+    'zip': ('application/zip', '.zip'),
+    'tar.gz': ('application/gzip', '.tar.gz')
+}
+ARCHIVE_BLOCK_SIZE = 64 * 1024   # 归档输出攒够该大小再交给响应
+ARCHIVE_QUEUE_BLOCKS = 16        # 生成协程最多领先响应的块数，限制内存占用
+
+class ArchiveStream:
+    """zipfile/tarfile 的输出目标
+
+    写入的数据攒成块放入有界队列，由响应生成器取出发送；队列满时生成协程等待，
+    内存占用与目录大小无关。响应结束后 close，生成协程的下一次写入会失败退出。
+    """
+    def __init__(self):
+        self.queue = queue.Queue(ARCHIVE_QUEUE_BLOCKS)
+        self.closed = False
+        self._buffer = bytearray()
+        self._position = 0
+
+    def write(self, data):
+        if self.closed:
+            raise Exception("Transfer cancelled")
+        self._buffer += data
+        self._position += len(data)
+        if len(self._buffer) >= ARCHIVE_BLOCK_SIZE:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+        return len(data)
+
+    def tell(self):
+        # 不支持 seek，zipfile 会改用数据描述符写入文件大小和 CRC
+        return self._position
+
+    def flush(self):
+        pass
+
+    def finish(self, error=None):
+        """由生成协程调用：发送剩余数据和结束标记"""
+        if self._buffer and error is None:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+        self._put(error)
+
+    def _put(self, item):
+        while True:
+            try:
+                self.queue.put(item, timeout=1)
+                return
+            except queue.Full:
+                if self.closed:
+                    raise Exception("Transfer cancelled")
+
+    def close(self):
+        self.closed = True
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+class RemoteFileReader:
+    """预读远程文件，读到的字节计入传输进度，取消时读取失败"""
+    def __init__(self, sftp, remote_path, size, on_read):
+        self.remote_file = sftp.open(remote_path, 'rb')
+        self.remote_file.prefetch(size)
+        self.remaining = size
+        self.on_read = on_read
 
-            def generate():
-                nonlocal temp_file
-                try:
-                    temp_file = tempfile.NamedTemporaryFile(delete=False)
-                    network_bytes = [0]
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        if size == 0:
+            return b''
+        data = self.remote_file.read(size)
+        self.remaining -= len(data)
+        self.on_read(len(data))
+        return data
 
-                    def progress_callback(transferred, total):
-                        # 检查是否取消
-                        if transfer_progress.is_cancelled():
-                            raise Exception("Transfer cancelled")
-                        network_bytes[0] += transferred
-                        if transfer_progress:
-                            transfer_progress.update(transferred)
+    def close(self):
+        self.remote_file.close()
 
-                    try:
-                        sftp.get(path, temp_file.name, callback=progress_callback)
-                    except Exception as e:
-                        if transfer_progress.is_cancelled():
-                            raise Exception("Transfer cancelled")
-                        raise e
+def iter_remote_tree(sftp, remote_path, name, on_listed=None):
+    """深度优先遍历远程目录，边列目录边产出 (远程路径, 归档内名称, 属性)，不跟随符号链接"""
+    entries = sorted(sftp.listdir_attr(remote_path), key=lambda attr: attr.filename)
+    if on_listed:
+        on_listed(entries)
+    for attr in entries:
+        child_path = remote_join(remote_path, attr.filename)
+        child_name = f"{name}/{attr.filename}"
+        if stat.S_ISDIR(attr.st_mode):
+            yield child_path, child_name, attr
+            yield from iter_remote_tree(sftp, child_path, child_name, on_listed)
+        elif stat.S_ISREG(attr.st_mode):
+            yield child_path, child_name, attr
 
-                    chunk_size = 8192
-                    with open(temp_file.name, 'rb') as f:
-                        while True:
-                            if transfer_progress.is_cancelled():
-                                raise Exception("Transfer cancelled")
-                            chunk = f.read(chunk_size)
-                            if not chunk:
-                                break
-                            yield chunk
+def write_remote_archive(stream, archive_format, connection, session_id, remote_root, transfer_progress):
+    """在后台协程中读取远程目录并写入归档流"""
+    transferred = [0]
 
-                except Exception as e:
-                    if "Transfer cancelled" in str(e):
-                        # 传输被取消的情况
-                        yield b''  # 发送空字节以结束响应
+    def on_read(count):
+        transferred[0] += count
+        transfer_progress.update(transferred[0])
+        if transfer_progress.is_cancelled():
+            raise Exception("Transfer cancelled")
+
+    def on_listed(entries):
+        # 目录边遍历边打包，总大小随遍历进度增加
+        transfer_progress.total_size += sum(attr.st_size for attr in entries if stat.S_ISREG(attr.st_mode))
+
+    root_name = os.path.basename(remote_root.rstrip('/')) or 'root'
+    try:
+        with connection_pool.sftp(connection, session_id) as sftp:
+            if archive_format == 'zip':
+                archive = zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED)
+            else:
+                archive = tarfile.open(fileobj=stream, mode='w|gz', bufsize=TAR_BUFFER_SIZE,
+                                       format=tarfile.PAX_FORMAT)
+            with archive:
+                for remote_path, name, attr in iter_remote_tree(sftp, remote_root, root_name, on_listed):
+                    is_dir = stat.S_ISDIR(attr.st_mode)
+                    if archive_format == 'zip':
+                        info = zipfile.ZipInfo(name + '/' if is_dir else name,
+                                               time.localtime(max(attr.st_mtime or 0, 315619200))[:6])
+                        info.external_attr = (attr.st_mode & 0xFFFF) << 16
+                        if is_dir:
+                            archive.writestr(info, b'')
+                            continue
+                        info.compress_type = zipfile.ZIP_DEFLATED
+                        info.file_size = attr.st_size
+                        reader = RemoteFileReader(sftp, remote_path, attr.st_size, on_read)
+                        try:
+                            with archive.open(info, 'w', force_zip64=attr.st_size >= zipfile.ZIP64_LIMIT) as dest:
+                                while True:
+                                    data = reader.read(TAR_BUFFER_SIZE)
+                                    if not data:
+                                        break
+                                    dest.write(data)
+                        finally:
+                            reader.close()
                     else:
-                        raise
-                finally:
-                    try:
-                        temp_file.close()
-                        os.unlink(temp_file.name)
-                    except:
-                        pass
-                    transfer_manager.remove_transfer(transfer_id)
-                    sftp.close()
-                    ssh.close()
+                        info = tarfile.TarInfo(name)
+                        info.mtime = attr.st_mtime or 0
+                        info.mode = attr.st_mode & 0o7777
+                        if is_dir:
+                            info.type = tarfile.DIRTYPE
+                            archive.addfile(info)
+                            continue
+                        info.size = attr.st_size
+                        reader = RemoteFileReader(sftp, remote_path, attr.st_size, on_read)
+                        try:
+                            archive.addfile(info, reader)
+                        finally:
+                            reader.close()
+        stream.finish()
+        log_sftp_operation('download_archive', remote_root)
+    except Exception as e:
+        if not stream.closed:
+            if "Transfer cancelled" not in str(e):
+                logger.error(f"Archive download error: {str(e)}")
+            try:
+                stream.finish(e)
+            except Exception:
+                pass
 
-            response = Response(
-                generate(),
-                mimetype='application/octet-stream',
-                headers={
-                    'Content-Disposition': f'attachment; filename={os.path.basename(path)}',
-                    'Content-Length': str(file_size)
-                }
-            )
-            return response
+@app.route('/sftp_download_archive', methods=['POST'])
+def download_archive():
+    """把远程目录打包为 zip 或 tar.gz 边生成边发送，不使用临时文件
 
-        except Exception as e:
-            sftp.close()
-            ssh.close()
-            if transfer_id:
+    归档在后台协程中生成，与响应之间只有有界队列，首个数据块生成后立即发送。
+    进度和取消与单文件下载相同，总大小随目录遍历逐步增加。
+    """
+    transfer_id = None
+    try:
+        data = request.json
+        connection = data['connection']
+        remote_path = data['path'].rstrip('/') or '/'
+        archive_format = data.get('format', 'zip')
+        if archive_format not in ARCHIVE_FORMATS:
+            return jsonify({"error": f"Unsupported archive format: {archive_format}"}), 400
+        with connection_pool.sftp(connection, data.get('sessionId')) as sftp:
+            if not stat.S_ISDIR(sftp.stat(remote_path).st_mode):
+                return jsonify({"error": f"Not a directory: {remote_path}"}), 400
+
+        transfer_id = data.get('transferId') or str(uuid.uuid4())
+        transfer_progress = transfer_manager.create_transfer(transfer_id, 0, 'download')
+        stream = ArchiveStream()
+        producer = socketio.start_background_task(
+            write_remote_archive, stream, archive_format, connection, data.get('sessionId'),
+            remote_path, transfer_progress)
+
+        def generate():
+            try:
+                while True:
+                    try:
+                        block = stream.queue.get(timeout=1)
+                    except queue.Empty:
+                        continue
+                    if block is None:
+                        break
+                    if isinstance(block, Exception):
+                        # 取消或出错时截断响应，与单文件下载一致
+                        break
+                    yield block
+            finally:
+                stream.close()
+                producer.join(timeout=5)
                 transfer_manager.remove_transfer(transfer_id)
-            raise
+
+        mimetype, extension = ARCHIVE_FORMATS[archive_format]
+        filename = (os.path.basename(remote_path) or 'root') + extension
+        return Response(generate(), mimetype=mimetype,
+                        headers={'Content-Disposition': f'attachment; filename={filename}'})
 
     except Exception as e:
-        if "Transfer cancelled" in str(e):
-            return jsonify({"status": "cancelled", "message": "Transfer cancelled"}), 200
+        if transfer_id:
+            transfer_manager.remove_transfer(transfer_id)
         return jsonify({"error": str(e)}), 500
 
 # 添加获取传输进度的路由
@@ -919,51 +3032,191 @@ def get_transfer_progress(transfer_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+DELETE_WORKERS = 8  # SFTP 删除时同时工作的通道数
+# 这些路径即使用户确认也不删除
+PROTECTED_DELETE_PATHS = {
+    '/', '/bin', '/boot', '/dev', '/etc', '/home', '/lib', '/lib32', '/lib64', '/opt', '/proc',
+    '/root', '/run', '/sbin', '/srv', '/sys', '/tmp', '/usr', '/var'
+}
+
+def check_delete_path(path) -> str:
+    """校验并规范化要删除的远程路径，不安全时抛出 ValueError"""
+    if not path or not path.startswith('/'):
+        raise ValueError("Delete path must be absolute")
+    if any(part == '..' for part in path.split('/')) or '\0' in path or '\n' in path:
+        raise ValueError(f"Refusing to delete suspicious path: {path}")
+    normalized = posixpath.normpath(path)
+    if normalized.startswith('//'):
+        normalized = '/' + normalized.lstrip('/')
+    if normalized in PROTECTED_DELETE_PATHS:
+        raise ValueError(f"Refusing to delete protected path: {normalized}")
+    return normalized
+
+class DeleteEngine(ParallelSFTPJob):
+    """递归删除
+
+    优先在远程执行 rm -rf，只需一个往返；rm 不可用时改用 SFTP：逐层并行列出目录树，
+    由工作协程池并发删除全部文件，再从最深一层开始逐层并发删除目录。
+    进度按已删除的条目数计算，可通过 /cancel_transfer 取消。符号链接只删除链接本身。
+    """
+    def __init__(self, connection, session_id=None, transfer_progress=None, workers=DELETE_WORKERS,
+                 use_exec=True, count_entries=False):
+        super().__init__(connection, session_id, transfer_progress, workers)
+        self.use_exec = use_exec
+        self.count_entries = count_entries
+        self.method = 'sftp'
+        self.removed = 0
+
+    def _add(self, count=1):
+        self.removed += count
+        if self.progress:
+            self.progress.update(self.removed)
+            if self.progress.is_cancelled():
+                raise Exception("Transfer cancelled")
+
+    def delete(self, path):
+        with connection_pool.sftp(self.connection, self.session_id) as sftp:
+            # lstat：路径本身是符号链接时只删除链接
+            attrs = sftp.lstat(path)
+            if stat.S_ISDIR(attrs.st_mode) and sftp.normalize(path) == sftp.normalize('.'):
+                raise ValueError("Refusing to delete the home directory")
+            if not stat.S_ISDIR(attrs.st_mode):
+                sftp.remove(path)
+                self._add()
+                return
+        if self.use_exec and self._delete_exec(path):
+            return
+        self._delete_sftp(path)
+
+    def _delete_exec(self, path) -> bool:
+        """远程 rm -rfv，逐行统计已删除的条目；rm 还没删除任何条目就失败时返回 False 以改用 SFTP"""
+        quoted = shlex.quote(path)
+        # rm -v 每删除一个条目输出一行；count_entries 时先用 find 统计总数作为第一行输出，
+        # 大目录树上这次预扫描的耗时与删除本身相当，默认不统计，进度只报告已删除的条目数
+        command = f"rm -rfv -- {quoted}"
+        if self.count_entries:
+            command = f"find {quoted} 2>/dev/null | wc -l; {command}"
+        try:
+            with connection_pool.client(self.connection, self.session_id) as client:
+                channel = client.get_transport().open_session()
+                try:
+                    channel.exec_command(command)
+                    stream = channel.makefile('rb')
+                    if self.count_entries:
+                        total = stream.readline().strip()
+                        if self.progress and total.isdigit():
+                            self.progress.total_size = int(total)
+                    while True:
+                        line = stream.readline()
+                        if not line:
+                            break
+                        self.method = 'exec'
+                        self._add()
+                    exit_status = channel.recv_exit_status()
+                    error = channel.makefile_stderr('rb').read().decode('utf-8', 'replace').strip()
+                finally:
+                    # 取消时关闭通道，远程 rm 在下一次输出时收到 SIGPIPE 退出
+                    channel.close()
+        except Exception as e:
+            if "Transfer cancelled" in str(e) or self.method == 'exec':
+                raise
+            logger.info(f"rm unavailable for {path}, using SFTP: {e}")
+            return False
+        if exit_status != 0 and self.method != 'exec':
+            # rm 不存在、不支持 -v 等，尚未删除任何条目，改用 SFTP
+            logger.info(f"rm failed for {path} ({exit_status}: {error}), using SFTP")
+            return False
+        self.method = 'exec'
+        if exit_status != 0:
+            self.errors.append({"path": path, "error": error or f"rm exited with {exit_status}"})
+        return True
+
+    def _delete_sftp(self, path):
+        levels = [[path]]
+        files = []
+
+        def list_directory(sftp, item):
+            remote_path, children = item
+            for attr in sftp.listdir_attr(remote_path):
+                child_path = remote_join(remote_path, attr.filename)
+                if stat.S_ISDIR(attr.st_mode):
+                    children.append(child_path)
+                else:
+                    files.append((child_path,))
+
+        # 逐层并行列出目录树
+        level = [path]
+        while level:
+            listed = [(directory, []) for directory in level]
+            self.run_parallel(listed, list_directory)
+            level = [child for _, children in listed for child in children]
+            if level:
+                levels.append(level)
+        if self.progress:
+            self.progress.total_size = len(files) + sum(len(level) for level in levels)
+
+        def remove_file(sftp, item):
+            sftp.remove(item[0])
+            self._add()
+
+        def remove_directory(sftp, item):
+            sftp.rmdir(item[0])
+            self._add()
+
+        self.run_parallel(files, remove_file)
+        # 子目录先于父目录删除；同一层的目录互不依赖
+        for level in reversed(levels):
+            if self.errors:
+                # 有文件删除失败时上层目录必然非空，不再继续
+                break
+            self.run_parallel([(directory,) for directory in level], remove_directory)
+
+    def result(self) -> Dict:
+        return {
+            "method": self.method,
+            "status": "partial" if self.errors else "success",
+            "removed": self.removed,
+            "errors": self.errors
+        }
+
 @app.route('/sftp_delete_item', methods=['POST'])
 def delete_item():
+    """删除远程文件或目录，目录递归删除，可带 transferId 查询进度和取消"""
+    transfer_id = None
     try:
         data = request.json
         connection = data['connection']
-        path = data['path']
+        path = check_delete_path(data['path'])
+        transfer_id = data.get('transferId') or str(uuid.uuid4())
+        transfer_progress = transfer_manager.create_transfer(transfer_id, 0, 'delete')
 
-        ssh, sftp = create_sftp_client(connection)
-        try:
-            def remove_recursive(sftp_client, remote_path):
-                """递归删除文件或目录"""
-                try:
-                    # 获取文件/目录属性
-                    stat_info = sftp_client.stat(remote_path)
-                    
-                    # 如果是目录，递归删除其内容
-                    if stat.S_ISDIR(stat_info.st_mode):
-                        for item in sftp_client.listdir_attr(remote_path):
-                            item_path = os.path.join(remote_path, item.filename).replace('\\', '/')
-                            remove_recursive(sftp_client, item_path)
-                        
-                        # 删除空目录
-                        sftp_client.rmdir(remote_path)
-                    else:
-                        # 如果是文件，直接删除
-                        sftp_client.remove(remote_path)
-                
-                except IOError as e:
-                    # 处理权限或其他删除错误
-                    logging.error(f"Error deleting {remote_path}: {e}")
-                    raise
+        settings = load_settings()
+        use_exec = data.get('exec')
+        if use_exec is None:
+            use_exec = settings.get('deleteUseExec', True)
+        count_entries = data.get('countEntries')
+        if count_entries is None:
+            count_entries = settings.get('deleteCountEntries', False)
+        engine = DeleteEngine(connection, data.get('sessionId'), transfer_progress,
+                              use_exec=bool(use_exec), count_entries=bool(count_entries))
+        engine.delete(path)
 
-            # 执行递归删除
-            remove_recursive(sftp, path)
-            
-            log_sftp_operation('delete', path)
-            return jsonify({"status": "success"})
-        
-        finally:
-            sftp.close()
-            ssh.close()
-    
+        log_sftp_operation('delete', path)
+        result = engine.result()
+        if engine.errors:
+            return jsonify(dict(result, error=engine.errors[0]['error'])), 500
+        return jsonify(result)
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
+        if "Transfer cancelled" in str(e):
+            return jsonify({"status": "cancelled", "message": "Transfer cancelled"}), 200
         logging.error(f"Error in delete_item: {e}")
         return jsonify({"error": str(e)}), 500
+    finally:
+        if transfer_id:
+            transfer_manager.remove_transfer(transfer_id)
 
 @app.route('/sftp_rename_item', methods=['POST'])
 def rename_item():
@@ -973,14 +3226,10 @@ def rename_item():
         old_path = data['oldPath']
         new_path = data['newPath']
 
-        ssh, sftp = create_sftp_client(connection)
-        try:
+        with connection_pool.sftp(connection, data.get('sessionId')) as sftp:
             sftp.rename(old_path, new_path)
             log_sftp_operation('rename', f"{old_path} to {new_path}")
             return jsonify({"status": "success"})
-        finally:
-            sftp.close()
-            ssh.close()
     except Exception as e:
         logging.error("Exception in rename_item: %s", str(e))
         return jsonify({"error": "An internal error has occurred."}), 500
@@ -992,14 +3241,10 @@ def create_folder():
         connection = data['connection']
         path = data['path']
 
-        ssh, sftp = create_sftp_client(connection)
-        try:
+        with connection_pool.sftp(connection, data.get('sessionId')) as sftp:
             sftp.mkdir(path)
             log_sftp_operation('create_folder', path)
             return jsonify({"status": "success"})
-        finally:
-            sftp.close()
-            ssh.close()
     except Exception as e:
         logging.error("Exception in create_folder: %s", str(e))
         return jsonify({"error": "An internal error has occurred."}), 500
@@ -1065,25 +3310,600 @@ def cleanup():
 
 # 修改 cleanup 相关代码，确保实时线程也被正确清理
 def cleanup_session(session):
+    """释放会话持有的通道、传输和读写线程，通道已由远端关闭时同样需要调用"""
     try:
-        if not session.active:
-            return
-            
         session.active = False
-        if session.channel:
+        session.stop_input()
+        session.release_flow()
+        with session.lock:
+            if session.channel:
+                try:
+                    session.channel.close()
+                except:
+                    pass
+            if session.ssh_client:
+                try:
+                    session.ssh_client.close()
+                except:
+                    pass
+        if session.read_thread and session.read_thread.is_alive():
+            session.read_thread.join(timeout=1)
+    except Exception as e:
+        terminal_logger.error(f"Error in cleanup_session: {e}")
+
+def close_session(session_id, message='Connection closed') -> bool:
+    """从注册表移除会话并释放资源，通知房间内的客户端"""
+    session = session_registry.remove(session_id)
+    if not session:
+        return False
+    was_active = session.active
+    cleanup_session(session)
+    room = session_room(session_id)
+    if was_active:
+        socketio.emit('ssh_closed', {
+            'session_id': session_id,
+            'message': message
+        }, room=room)
+    socketio.close_room(room)
+    return True
+
+# 会话生命周期默认参数
+SESSION_ORPHAN_GRACE = 600   # 属主断开后保留会话等待重连的时间（秒）
+SESSION_MAX_COUNT = 32       # 同时存在的最大会话数
+SESSION_REAP_INTERVAL = 30   # 回收检查间隔（秒）
+
+class SessionLifecycleManager:
+    """回收孤儿会话和已关闭的会话，并限制会话总数"""
+    def __init__(self, orphan_grace: float = SESSION_ORPHAN_GRACE,
+                 max_sessions: int = SESSION_MAX_COUNT):
+        self.orphan_grace = orphan_grace
+        self.max_sessions = max_sessions
+        self.reaped = 0
+        self._reaper = None
+        # 已通过上限检查、正在连接尚未注册的会话，连接期间会让出协程，需要一并计数
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def configure(self, settings=None):
+        settings = settings or {}
+        if settings.get('sessionOrphanGrace') is not None:
+            self.orphan_grace = float(settings['sessionOrphanGrace'])
+        if settings.get('maxSessions'):
+            self.max_sessions = int(settings['maxSessions'])
+
+    def reap(self) -> int:
+        """关闭远端已断开的会话和超过宽限期的孤儿会话，返回回收数量"""
+        now = time.time()
+        expired = [
+            session_id
+            for session_id, session in session_registry.snapshot().items()
+            if not session.active
+            or (session.orphaned_at and now - session.orphaned_at > self.orphan_grace)
+        ]
+        count = 0
+        for session_id in expired:
+            if close_session(session_id, 'Session expired'):
+                terminal_logger.info(f"Reaped session {session_id}")
+                count += 1
+        self.reaped += count
+        return count
+
+    def reserve(self, session_id) -> bool:
+        """新建会话前调用，成功时为 session_id 占用一个名额，之后必须调用 release
+
+        达到上限时先回收，再按孤儿时间最久的顺序腾出位置。
+        """
+        self._ensure_reaper()
+        if self._try_reserve(session_id):
+            return True
+        self.reap()
+        orphans = sorted(
+            (session.orphaned_at, orphan_id)
+            for orphan_id, session in session_registry.snapshot().items()
+            if session.orphaned_at
+        )
+        while self._count() >= self.max_sessions and orphans:
+            _, orphan_id = orphans.pop(0)
+            if close_session(orphan_id, 'Session evicted'):
+                self.reaped += 1
+        return self._try_reserve(session_id)
+
+    def release(self, session_id):
+        """会话已注册或连接失败后释放 reserve 占用的名额"""
+        with self._lock:
+            self._pending.discard(session_id)
+
+    def _count(self) -> int:
+        # 已注册的会话不重复计数
+        pending = sum(1 for session_id in self._pending if session_registry.get(session_id) is None)
+        return len(session_registry) + pending
+
+    def _try_reserve(self, session_id) -> bool:
+        with self._lock:
+            if self._count() >= self.max_sessions:
+                return False
+            self._pending.add(session_id)
+            return True
+
+    def stats(self) -> Dict:
+        now = time.time()
+        sessions = []
+        for session_id, session in session_registry.snapshot().items():
+            sessions.append({
+                'session_id': session_id,
+                'owner': session.client_id,
+                'active': session.active,
+                'bytes_in': session.bytes_in,
+                'bytes_out': session.bytes_out,
+                'created_at': session.created_at,
+                'last_activity': session.last_activity,
+                'idle_seconds': round(now - session.last_activity, 1),
+                'orphaned_seconds': round(now - session.orphaned_at, 1) if session.orphaned_at else None,
+                'sftp_channels': session.sftp_channels,
+                'scrollback_bytes': session.scrollback.size
+            })
+        return {
+            **session_registry.stats(),
+            'max_sessions': self.max_sessions,
+            'pending_sessions': len(self._pending),
+            'orphan_grace': self.orphan_grace,
+            'reaped_sessions': self.reaped,
+            'connection_pool': connection_pool.stats(),
+            'session_workers': session_workers.stats(),
+            'session_list': sessions
+        }
+
+    def _ensure_reaper(self):
+        if self._reaper is None:
+            self._reaper = socketio.start_background_task(self._reap_loop)
+
+    def _reap_loop(self):
+        while True:
+            socketio.sleep(SESSION_REAP_INTERVAL)
             try:
-                session.channel.close()
-            except:
-                pass
-        if session.ssh_client:
+                self.reap()
+            except Exception as e:
+                terminal_logger.error(f"Error reaping sessions: {e}")
+
+# 全局会话生命周期管理
+session_lifecycle = SessionLifecycleManager()
+
+@app.route('/sessions/stats', methods=['GET'])
+def get_session_stats():
+    return jsonify(session_lifecycle.stats())
+
+@app.route('/executor/stats', methods=['GET'])
+def get_executor_stats():
+    return jsonify(blocking_executor.stats())
+
+# 会话工作进程之间的消息帧：头部长度、负载长度、JSON 头部、原始负载
+IPC_FRAME_HEADER = struct.Struct('!II')
+SESSION_WORKER_OPEN_TIMEOUT = 45     # 等待工作进程建立连接的时间（秒）
+SESSION_WORKER_REQUEST_TIMEOUT = 15  # 其他请求的等待时间（秒）
+
+class IPCConnection:
+    """基于本地 TCP 的帧连接，头部为 JSON，终端数据作为原始负载附带"""
+    def __init__(self, sock):
+        self.sock = sock
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = sock.makefile('rb')
+        self._send_lock = threading.Lock()
+
+    def send(self, header: Dict, payload: bytes = b''):
+        encoded = json.dumps(header).encode('utf-8')
+        frame = IPC_FRAME_HEADER.pack(len(encoded), len(payload)) + encoded
+        with self._send_lock:
+            if len(payload) < 4096:
+                # 按键等小帧合并为一次写入
+                self.sock.sendall(frame + payload)
+            else:
+                self.sock.sendall(frame)
+                self.sock.sendall(payload)
+
+    def _read_exactly(self, size: int) -> bytes:
+        data = self._reader.read(size) if size else b''
+        if len(data) < size:
+            raise EOFError('IPC connection closed')
+        return data
+
+    def recv(self) -> Tuple[Dict, bytes]:
+        header_size, payload_size = IPC_FRAME_HEADER.unpack(self._read_exactly(IPC_FRAME_HEADER.size))
+        header = json.loads(self._read_exactly(header_size))
+        return header, self._read_exactly(payload_size)
+
+    def close(self):
+        try:
+            self.sock.close()
+        except Exception:
+            pass
+
+class WorkerChannel:
+    """前端进程中代表工作进程内终端通道的对象，提供会话代码用到的通道接口"""
+    def __init__(self, worker, session_id):
+        self.worker = worker
+        self.session_id = session_id
+        self.closed = False
+
+    def send(self, data) -> int:
+        if self.closed:
+            return 0
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.worker.send({'op': 'input', 'session_id': self.session_id}, data)
+        return len(data)
+
+    def resize_pty(self, width=80, height=24):
+        self.worker.send({'op': 'resize', 'session_id': self.session_id, 'width': width, 'height': height})
+
+    def update_environment(self, environment):
+        # 环境变量只在打开通道时生效，工作进程中已设置
+        pass
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.worker.sessions.discard(self.session_id)
             try:
-                session.ssh_client.close()
-            except:
+                self.worker.send({'op': 'close', 'session_id': self.session_id})
+            except Exception:
                 pass
-        if session.read_thread and session.read_thread.is_alive():
-            session.read_thread.join(timeout=1)
+
+class RemoteSSHSession(SSHSession):
+    """运行在会话工作进程中的终端会话在前端进程中的代理
+
+    回滚缓冲、输出编码和房间推送仍在前端进程完成；流控确认转发给工作进程，
+    由工作进程暂停读取通道。
+    """
+    def __init__(self, worker, session_id):
+        self.worker = worker
+        self.session_id = session_id
+        super().__init__(None, WorkerChannel(worker, session_id))
+
+    @property
+    def flow_control(self):
+        return self._flow_control
+
+    @flow_control.setter
+    def flow_control(self, enabled):
+        self._flow_control = bool(enabled)
+        # 构造期间会话尚未在工作进程中打开，不需要转发
+        if self.session_id in self.worker.sessions:
+            self.worker.send({'op': 'flow', 'session_id': self.session_id, 'enabled': self._flow_control})
+
+    def ack_output(self, seq: int):
+        super().ack_output(seq)
+        self.worker.send({'op': 'ack', 'session_id': self.session_id, 'seq': self.acked_seq})
+
+    def release_flow(self):
+        super().release_flow()
+        try:
+            self.worker.send({'op': 'release', 'session_id': self.session_id})
+        except Exception:
+            pass
+
+    def exec_command(self, command: str) -> str:
+        reply = self.worker.request({'op': 'exec', 'session_id': self.session_id, 'command': command})
+        if reply.get('error'):
+            raise RuntimeError(reply['error'])
+        return reply.get('output', '')
+
+class SessionWorker:
+    """前端进程持有的一个会话工作进程及其连接"""
+    def __init__(self, connection: IPCConnection, pid):
+        self.connection = connection
+        self.pid = pid
+        self.sessions = set()
+        self.alive = True
+        self._pending = {}  # request_id -> [Event, reply]
+        self._pending_lock = threading.Lock()
+
+    def send(self, header: Dict, payload: bytes = b''):
+        if not self.alive:
+            raise IOError('Session worker is not running')
+        self.connection.send(header, payload)
+
+    def request(self, header: Dict, timeout: float = SESSION_WORKER_REQUEST_TIMEOUT) -> Dict:
+        """发送请求并等待工作进程的回复"""
+        request_id = uuid.uuid4().hex
+        pending = [threading.Event(), None]
+        with self._pending_lock:
+            self._pending[request_id] = pending
+        try:
+            self.send(dict(header, request_id=request_id))
+            if not pending[0].wait(timeout):
+                raise TimeoutError('Session worker did not respond')
+            return pending[1]
+        finally:
+            with self._pending_lock:
+                self._pending.pop(request_id, None)
+
+    def resolve(self, request_id, reply: Dict):
+        with self._pending_lock:
+            pending = self._pending.get(request_id)
+        if pending:
+            pending[1] = reply
+            pending[0].set()
+
+    def fail_pending(self):
+        with self._pending_lock:
+            pending = list(self._pending.values())
+        for item in pending:
+            item[1] = {'error': 'Session worker exited', 'type': 'unknown'}
+            item[0].set()
+
+class SessionWorkerPool:
+    """将终端会话分散到多个工作进程，各进程独立完成 SSH 加解密
+
+    前端进程只负责 Socket.IO 和回滚缓冲，通过本地 TCP 与工作进程交换输入和输出帧。
+    """
+    def __init__(self):
+        self.workers = []
+        self.processes = []
+        self.size = 0
+        self._token = None
+        self._listener = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def start(self, size: int):
+        if size <= 0 or self._listener:
+            return
+        self.size = size
+        self._token = uuid.uuid4().hex
+        self._listener = socket.socket()
+        self._listener.bind(('127.0.0.1', 0))
+        self._listener.listen(size)
+        socketio.start_background_task(self._accept_loop)
+        for _ in range(size):
+            self._spawn()
+        atexit.register(self.stop)
+
+    def _spawn(self):
+        port = self._listener.getsockname()[1]
+        if getattr(sys, 'frozen', False):
+            command = [sys.executable, '--session-worker', str(port)]
+        else:
+            command = [sys.executable, os.path.abspath(__file__), '--session-worker', str(port)]
+        # 令牌通过环境变量传递，避免出现在进程列表中
+        env = dict(os.environ, SIMPLESHELL_WORKER_TOKEN=self._token)
+        with self._lock:
+            self.processes = [process for process in self.processes if process.poll() is None]
+            self.processes.append(subprocess.Popen(command, env=env))
+
+    def _accept_loop(self):
+        while True:
+            try:
+                sock, _ = self._listener.accept()
+            except Exception:
+                return
+            socketio.start_background_task(self._handshake, sock)
+
+    def _handshake(self, sock):
+        connection = IPCConnection(sock)
+        try:
+            header, _ = connection.recv()
+        except Exception:
+            connection.close()
+            return
+        if header.get('op') != 'hello' or header.get('token') != self._token:
+            logger.warning("Rejected session worker with invalid token")
+            connection.close()
+            return
+        worker = SessionWorker(connection, header.get('pid'))
+        with self._lock:
+            self.workers.append(worker)
+        logger.info(f"Session worker {worker.pid} connected")
+        self._read_loop(worker)
+
+    def _read_loop(self, worker: SessionWorker):
+        try:
+            while True:
+                header, payload = worker.connection.recv()
+                op = header.get('op')
+                session_id = header.get('session_id')
+                if op == 'output':
+                    session = session_registry.get(session_id)
+                    if session:
+                        output_sink.output(session_id, session, payload)
+                elif op == 'closed':
+                    worker.sessions.discard(session_id)
+                    output_sink.closed(session_id)
+                elif op == 'reply':
+                    worker.resolve(header.get('request_id'), header)
+        except Exception as e:
+            logger.error(f"Session worker {worker.pid} disconnected: {e}")
+        finally:
+            worker.alive = False
+            worker.fail_pending()
+            worker.connection.close()
+            with self._lock:
+                if worker in self.workers:
+                    self.workers.remove(worker)
+            # 工作进程退出时其上的会话全部结束
+            for session_id in list(worker.sessions):
+                output_sink.closed(session_id)
+            if self._listener:
+                # 补充一个工作进程，稍作等待避免反复崩溃时占满 CPU
+                socketio.sleep(1)
+                self._spawn()
+
+    def pick(self) -> Optional[SessionWorker]:
+        """返回会话数最少的工作进程，未启用或没有可用进程时返回 None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            workers = [worker for worker in self.workers if worker.alive]
+        if not workers:
+            return None
+        return min(workers, key=lambda worker: len(worker.sessions))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            workers = list(self.workers)
+        return {
+            'size': self.size,
+            'workers': [{'pid': worker.pid, 'sessions': len(worker.sessions)} for worker in workers]
+        }
+
+    def stop(self):
+        listener, self._listener = self._listener, None
+        if listener:
+            listener.close()
+        with self._lock:
+            workers = list(self.workers)
+        for worker in workers:
+            worker.connection.close()
+        for process in self.processes:
+            if process.poll() is None:
+                process.terminate()
+
+# 全局会话工作进程池
+session_workers = SessionWorkerPool()
+
+def open_worker_session(worker: SessionWorker, client_id, session_id, data):
+    """在工作进程中打开终端会话，前端进程注册代理会话"""
+    session = RemoteSSHSession(worker, session_id)
+    session.client_id = client_id
+    session.connection_key = SSHConnectionPool.connection_key(data)
+    if data.get('output_mode') in OUTPUT_MODES:
+        session.output_mode = data['output_mode']
+    session.flow_control = bool(data.get('flow_control'))
+    session.write_thread = threading.Thread(
+        target=write_input,
+        args=(session_id, session),
+        daemon=True
+    )
+    # 先注册并加入房间，工作进程连接成功后立即产生的输出不会丢失
+    session_registry.add(session_id, session)
+    worker.sessions.add(session_id)
+    join_room(session_room(session_id))
+
+    connection = {key: value for key, value in data.items() if key not in ('output_mode',)}
+    try:
+        reply = worker.request({'op': 'open', 'session_id': session_id, 'connection': connection},
+                               timeout=SESSION_WORKER_OPEN_TIMEOUT)
+    except Exception as e:
+        reply = {'error': f'Connection failed: {str(e)}', 'type': 'unknown'}
+
+    if reply.get('error'):
+        session_registry.remove(session_id)
+        worker.sessions.discard(session_id)
+        session.active = False
+        leave_room(session_room(session_id))
+        socketio.emit('ssh_error', {
+            'session_id': session_id,
+            'error': reply['error'],
+            'type': reply.get('type', 'unknown')
+        }, room=client_id)
+        return
+
+    session.start()
+    socketio.emit('ssh_connected', {
+        'session_id': session_id,
+        'message': 'Connected successfully'
+    }, room=client_id)
+    terminal_logger.info(f"SSH connection established for session {session_id} in worker {worker.pid}")
+    connection_usage.record(data)
+
+class WorkerOutputSink:
+    """工作进程中的输出去向：只统计序号用于流控，数据转发给前端进程"""
+    def __init__(self, connection: IPCConnection):
+        self.connection = connection
+
+    def output(self, session_id, session, data: bytes):
+        session.bytes_out += len(data)
+        session.last_activity = time.time()
+        session.scrollback.append(data)
+        self.connection.send({'op': 'output', 'session_id': session_id}, data)
+
+    def closed(self, session_id):
+        session = session_registry.remove(session_id)
+        if session:
+            socketio.start_background_task(cleanup_session, session)
+            self.connection.send({'op': 'closed', 'session_id': session_id})
+
+def handle_worker_request(connection: IPCConnection, header: Dict, payload: bytes):
+    """处理前端进程发来的一帧请求"""
+    op = header.get('op')
+    session_id = header.get('session_id')
+    session = session_registry.get(session_id)
+
+    if op == 'input':
+        if session and session.active:
+            session.input_queue.put(payload)
+    elif op == 'ack':
+        if session:
+            session.ack_output(int(header.get('seq', 0)))
+    elif op == 'release':
+        if session:
+            session.release_flow()
+    elif op == 'flow':
+        if session:
+            session.flow_control = bool(header.get('enabled'))
+            session.release_flow()
+    elif op == 'resize':
+        if session:
+            try:
+                session.channel.resize_pty(width=header['width'], height=header['height'])
+            except Exception as e:
+                logger.error(f"Error resizing terminal: {e}")
+    elif op == 'close':
+        session = session_registry.remove(session_id)
+        if session:
+            socketio.start_background_task(cleanup_session, session)
+    elif op == 'open':
+        socketio.start_background_task(worker_open_session, connection, header)
+    elif op == 'exec':
+        socketio.start_background_task(worker_exec_command, connection, header)
+
+def worker_open_session(connection: IPCConnection, header: Dict):
+    session_id = header['session_id']
+    data = header['connection']
+    reply = {'op': 'reply', 'request_id': header.get('request_id')}
+    try:
+        ssh, channel = create_ssh_client(data)
+        session = create_local_session(session_id, ssh, channel, data)
+        # 工作进程只需要序号做流控，不保留输出内容
+        session.scrollback = ScrollbackBuffer(0)
+        session.start()
     except Exception as e:
-        print(f"Error in cleanup_session: {e}")
+        reply['type'], reply['error'] = describe_connect_error(e)
+    connection.send(reply)
+
+def worker_exec_command(connection: IPCConnection, header: Dict):
+    reply = {'op': 'reply', 'request_id': header.get('request_id')}
+    session = session_registry.get(header.get('session_id'))
+    try:
+        if not session:
+            raise KeyError('Session not found')
+        reply['output'] = run_session_command(session, header['command'])
+    except Exception as e:
+        reply['error'] = str(e)
+    connection.send(reply)
+
+def run_session_worker(port: int):
+    """会话工作进程入口：连接前端进程并处理请求，前端断开时退出"""
+    global output_sink
+    connection = IPCConnection(socket.create_connection(('127.0.0.1', port)))
+    connection.send({'op': 'hello', 'token': os.environ.get('SIMPLESHELL_WORKER_TOKEN'), 'pid': os.getpid()})
+    output_sink = WorkerOutputSink(connection)
+    try:
+        while True:
+            header, payload = connection.recv()
+            try:
+                handle_worker_request(connection, header, payload)
+            except Exception as e:
+                logger.error(f"Error handling worker request {header.get('op')}: {e}")
+    except EOFError:
+        pass
+    finally:
+        for session in session_registry.snapshot().values():
+            cleanup_session(session)
+        connection_pool.close_all()
+
 
 class SSHService:
     
@@ -1157,18 +3977,23 @@ class SocketService:
     def register_handlers(self):
         self.sio.on('monitor_resources', self.handle_resource_monitor)
 
+def run_session_command(session, command: str) -> str:
+    """在会话的传输上执行命令并返回标准输出"""
+    if isinstance(session, RemoteSSHSession):
+        return session.exec_command(command)
+    stdin, stdout, stderr = session.ssh_client.exec_command(command)
+    return stdout.read().decode().strip()
+
 # 修改 handle_ssh_connection 函数，添加资源监控相关代码
 @socketio.on('monitor_resources')
 def handle_resource_monitor(data):
     try:
         session_id = data.get('session_id')
-        if not session_id or session_id not in ssh_sessions:
+        session = session_registry.get(session_id) if session_id else None
+        if not session:
             logger.warning(f"Invalid session for resource monitoring: {session_id}")
             return
             
-        session = ssh_sessions[session_id]
-        ssh_client = session.ssh_client
-        
         logger.info(f"Getting resource usage for session {session_id}")
         
         try:
@@ -1178,11 +4003,8 @@ def handle_resource_monitor(data):
             mem_cmd = "free | grep Mem || cat /proc/meminfo"
             
             # 执行命令
-            stdin, stdout, stderr = ssh_client.exec_command(cpu_cmd)
-            cpu_output = stdout.read().decode().strip()
-            
-            stdin, stdout, stderr = ssh_client.exec_command(mem_cmd)
-            mem_output = stdout.read().decode().strip()
+            cpu_output = run_session_command(session, cpu_cmd)
+            mem_output = run_session_command(session, mem_cmd)
             
             # 解析 CPU 使用率
             cpu_usage = 0
@@ -1228,7 +4050,7 @@ def handle_resource_monitor(data):
                     'cpu': round(cpu_usage, 1),
                     'memory': round(mem_usage, 1)
                 }
-            })
+            }, room=request.sid)
                 
         except Exception as e:
             logger.error(f"Error executing commands: {str(e)}")
@@ -1242,7 +4064,7 @@ def handle_resource_monitor(data):
                 'cpu': 0,
                 'memory': 0
             }
-        })
+        }, room=request.sid)
 
 # AI 相关的路由和函数
 @app.route('/chat', methods=['POST'])
@@ -1619,8 +4441,7 @@ def read_file():
         connection = data['connection']
         path = data['path']
 
-        ssh, sftp = create_sftp_client(connection)
-        try:
+        with connection_pool.sftp(connection, data.get('sessionId')) as sftp:
             # 获取文件属性
             stat_info = sftp.stat(path)
             
@@ -1634,25 +4455,26 @@ def read_file():
                     "type": "large"
                 }), 413  # Payload Too Large
 
-            # 读取文件内容，使用 'replace' 处理无法解码的字符
-            with sftp.file(path, 'r') as remote_file:
-                content = remote_file.read().decode('utf-8', errors='replace')
+            # 只读取一次，解码在线程池中进行
+            with sftp.file(path, 'rb') as remote_file:
+                remote_file.prefetch(stat_info.st_size)
+                raw = remote_file.read()
             
             # 如果是图片，返回 Base64 编码
             file_extension = path.split('.')[-1].lower()
             image_extensions = ['png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp', 'svg']
             
             if file_extension in image_extensions:
-                # 对于图片，重新读取并转换为 Base64
-                with sftp.file(path, 'rb') as img_file:
-                    import base64
-                    base64_content = base64.b64encode(img_file.read()).decode('utf-8')
-                    return jsonify({
-                        "content": base64_content,
-                        "type": "image",
-                        "size": stat_info.st_size,
-                        "extension": file_extension
-                    })
+                base64_content = blocking_executor.run(lambda: base64.b64encode(raw).decode('utf-8'))
+                return jsonify({
+                    "content": base64_content,
+                    "type": "image",
+                    "size": stat_info.st_size,
+                    "extension": file_extension
+                })
+            
+            # 使用 'replace' 处理无法解码的字符
+            content = blocking_executor.run(raw.decode, 'utf-8', errors='replace')
             
             return jsonify({
                 "content": content,
@@ -1660,9 +4482,6 @@ def read_file():
                 "size": stat_info.st_size,
                 "extension": file_extension
             })
-        finally:
-            sftp.close()
-            ssh.close()
     except Exception as e:
         logging.error(f"Error reading file {path}: {e}")
         return jsonify({"error": str(e)}), 500
@@ -1759,6 +4578,11 @@ def query_ip():
         })
 
 if __name__ == '__main__':
+    if len(sys.argv) > 2 and sys.argv[1] == '--session-worker':
+        configure_logging(load_settings())
+        run_session_worker(int(sys.argv[2]))
+        sys.exit(0)
+
     try:
         # 确保日志文件目录存在
         log_dir = os.path.dirname(LOG_PATH)
@@ -1779,6 +4603,10 @@ if __name__ == '__main__':
         print(f"Log file: {LOG_PATH}")
         
         minimal_startup_checks()
+        configure_logging(load_settings())
+        session_lifecycle.configure(load_settings())
+        session_workers.start(int(load_settings().get('sessionWorkers') or 0))
+        socketio.start_background_task(prewarm_top_connections)
         profile_startup()
     except Exception as e:
         print(f"Failed to start server: {e}")
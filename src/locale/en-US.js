@@ -20,7 +20,12 @@ export default {
     close: 'Close',
     open: 'Open',
     edit: 'Edit',
-    duplicate: 'Duplicate'
+    duplicate: 'Duplicate',
+    performanceProfile: 'Performance Profile',
+    profileDefault: 'Default',
+    profileLan: 'LAN throughput',
+    profileWan: 'WAN low-bandwidth',
+    profileCustom: 'Custom (config.json)'
   },
   settings: {
     title: 'Settings',
@@ -92,6 +97,7 @@ export default {
     renameSuccess: 'Renamed successfully',
     createFolderSuccess: 'Folder created successfully',
     downloadFolder: 'Download Folder',
+    downloadFolderArchive: 'Download as ZIP',
     selectFolderToSave: 'Select folder to save',
     select: 'Select',
     downloadingFolder: 'Downloading folder {name}...',
@@ -128,6 +134,7 @@ export default {
     uploadCancelled: 'Upload cancelled',
     downloadCancelled: 'Download cancelled',
     uploadPartialSuccess: 'Upload completed: {success} succeeded, {fail} failed',
+    folderTransferPartial: 'Folder transfer completed: {success} files succeeded, {fail} failed',
     pageSizeOptions: 'Items per page',
     pageSizeSaved: 'Page size setting saved',
     pageSizeSaveFailed: 'Failed to save page size setting'
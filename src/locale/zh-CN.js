@@ -20,7 +20,12 @@ export default {
     close: '关闭',
     open: '打开',
     edit: '编辑',
-    duplicate: '复制'
+    duplicate: '复制',
+    performanceProfile: '性能配置',
+    profileDefault: '默认',
+    profileLan: '局域网高吞吐',
+    profileWan: '广域网低带宽',
+    profileCustom: '自定义（config.json）'
   },
   settings: {
     title: '设置',
@@ -92,6 +97,7 @@ export default {
     renameSuccess: '重命名成功',
     createFolderSuccess: '文件夹创建成功',
     downloadFolder: '下载文件夹',
+    downloadFolderArchive: '打包为 ZIP 下载',
     selectFolderToSave: '选择保存位置',
     select: '选择',
     downloadingFolder: '正在下载文件夹 {name}...',
@@ -130,6 +136,7 @@ export default {
     uploadCancelled: '上传已取消',
     downloadCancelled: '下载已取消',
     uploadPartialSuccess: '上传完成：{success} 个成功，{fail} 个失败',
+    folderTransferPartial: '文件夹传输完成：{success} 个文件成功，{fail} 个失败',
     pageSizeOptions: '每页显示',
     pageSizeSaved: '分页设置已保存',
     pageSizeSaveFailed: '分页设置保存失败'